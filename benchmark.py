@@ -0,0 +1,356 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from typing import Optional
+
+from simos.events import QuietLog
+from simos.loader import load_operations, load_processes
+from simos.managers.memory import MemoryManager, OutOfMemoryError
+from simos.managers.storage import FileManager
+from simos.simulation import Simulation
+from simos.tracefile import compile_trace, load_trace
+from simos.types import SystemError
+from simos.workload import WorkloadConfig, write_workload
+
+
+def bench_load(process_path: str, ops_path: str):
+    start = time.perf_counter()
+    processes = load_processes(process_path)
+    operations = load_operations(ops_path, processes)
+    elapsed = time.perf_counter() - start
+
+    records = len(processes) + len(operations.pid)
+    return records, elapsed
+
+
+def bench_load_trace(trace_path: str) -> float:
+    start = time.perf_counter()
+    load_trace(trace_path)
+    return time.perf_counter() - start
+
+
+def bench_memory(processes) -> tuple[int, float]:
+    # Aloca a memória de cada processo; quando falta espaço, libera os
+    # mais antigos. Mede só o custo de alocação e liberação.
+    mm = MemoryManager()
+    resident = {True: deque(), False: deque()}
+    ops = 0
+
+    start = time.perf_counter()
+    for pid in range(len(processes)):
+        realtime = processes.priority[pid] == 0
+        blocks = processes.allocated_blocks[pid]
+        while True:
+            try:
+                if realtime:
+                    offset = mm.allocate_real_time(pid, blocks)
+                else:
+                    offset = mm.allocate_user(pid, blocks)
+                resident[realtime].append((offset, blocks))
+                ops += 1
+                break
+            except OutOfMemoryError:
+                ops += 1
+                mm.waiting_queues[realtime].clear()
+                if len(resident[realtime]) == 0:
+                    break
+                offset, size = resident[realtime].popleft()
+                mm.free(offset, size)
+                ops += 1
+    elapsed = time.perf_counter() - start
+
+    return ops, elapsed
+
+
+def bench_storage(operations) -> tuple[int, float]:
+    fm = FileManager(operations.total_blocks, operations.initial_files)
+
+    start = time.perf_counter()
+    for row in range(len(operations.pid)):
+        pid = operations.pid[row]
+        try:
+            if operations.create[row]:
+                fm.create_file(pid, operations.filename(row), operations.blocks[row])
+            else:
+                fm.delete_file(pid, operations.filename(row))
+        except SystemError:
+            pass
+    elapsed = time.perf_counter() - start
+
+    return len(operations.pid), elapsed
+
+
+def bench_simulation(processes, operations) -> tuple[int, float, int]:
+    simulation = Simulation(processes, operations, QuietLog())
+    start = time.perf_counter()
+    simulation.run()
+    elapsed = time.perf_counter() - start
+
+    return simulation.steps, elapsed, simulation.manager.time
+
+
+def peak_memory(processes, operations) -> int:
+    tracemalloc.start()
+    Simulation(processes, operations, QuietLog()).run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def run_benchmarks(sizes: list[int], config: WorkloadConfig) -> dict[str, dict]:
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            config.processes = size
+            process_path, ops_path = write_workload(f"{directory}/{size}", config)
+
+            records, elapsed = bench_load(process_path, ops_path)
+            results[f"load/{size}"] = {"ops": records, "seconds": elapsed}
+
+            processes = load_processes(process_path)
+            operations = load_operations(ops_path, processes)
+
+            ops, elapsed = bench_memory(processes)
+            results[f"memory/{size}"] = {"ops": ops, "seconds": elapsed}
+
+            ops, elapsed = bench_storage(operations)
+            results[f"storage/{size}"] = {"ops": ops, "seconds": elapsed}
+
+            steps, elapsed, clock = bench_simulation(processes, operations)
+            results[f"simulation/{size}"] = {
+                "ops": steps,
+                "seconds": elapsed,
+                "simulated_ticks": clock,
+                "peak_bytes": peak_memory(processes, operations),
+            }
+
+    for result in results.values():
+        result["rate"] = result["ops"] / result["seconds"] if result["seconds"] else 0.0
+    return results
+
+
+def wall_time(command: list[str], repeat: int) -> float:
+    """Menor tempo de parede de `repeat` execuções do comando"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_startup(
+    sizes: list[int],
+    config: WorkloadConfig,
+    samples: str,
+    repeat: int,
+    baseline_tree: Optional[str] = None,
+) -> tuple[dict[str, dict], dict[str, dict]]:
+    """Tempo de parede do dispatcher em casos pequenos, lendo os traços
+    em texto e compilados, comparado ao de um interpretador vazio. A
+    leitura dos traços também é medida à parte, no próprio processo.
+
+    Com `baseline_tree` (outra cópia do simulador, ex.: a versão original)
+    os casos em texto também são medidos com o dispatcher dela; esses
+    tempos são retornados como referência, no formato de `--save`."""
+    dispatcher = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dispatcher.py")
+    results = {"python": {"seconds": wall_time([sys.executable, "-c", "pass"], repeat)}}
+    baseline: dict[str, dict] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        traces = []
+        if os.path.isdir(samples):
+            for name in sorted(os.listdir(samples)):
+                process_path = os.path.join(samples, name, "processes.txt")
+                ops_path = os.path.join(samples, name, "files.txt")
+                if os.path.exists(process_path) and os.path.exists(ops_path):
+                    traces.append((f"{samples}/{name}", process_path, ops_path))
+        for size in sizes:
+            config.processes = size
+            process_path, ops_path = write_workload(f"{directory}/{size}", config)
+            traces.append((f"gerado/{size}", process_path, ops_path))
+
+        for index, (name, process_path, ops_path) in enumerate(traces):
+            trace_path = f"{directory}/{index}.trace"
+            # Os avisos da leitura não interessam aqui
+            with contextlib.redirect_stdout(io.StringIO()):
+                compile_trace(process_path, ops_path, trace_path)
+                text_load = min(bench_load(process_path, ops_path)[1] for _ in range(repeat))
+                compiled_load = min(bench_load_trace(trace_path) for _ in range(repeat))
+
+            text = wall_time([sys.executable, dispatcher, process_path, ops_path], repeat)
+            compiled = wall_time([sys.executable, dispatcher, trace_path], repeat)
+            results[f"text/{name}"] = {"seconds": text, "load_seconds": text_load}
+            results[f"compiled/{name}"] = {
+                "seconds": compiled,
+                "load_seconds": compiled_load,
+                "speedup": text / compiled,
+            }
+            if baseline_tree is not None:
+                reference = os.path.join(baseline_tree, "dispatcher.py")
+                baseline[f"text/{name}"] = {
+                    "seconds": wall_time([sys.executable, reference, process_path, ops_path], repeat)
+                }
+    return results, baseline
+
+
+def print_startup(results: dict[str, dict], baseline: dict[str, dict]):
+    print(
+        f"{'caso':<28}{'total (ms)':>12}{'leitura (ms)':>14}{'vs texto':>10}{'vs base':>10}"
+    )
+    for name, result in results.items():
+        load = result.get("load_seconds")
+        load_str = f"{load * 1000:.2f}" if load is not None else "-"
+        speedup = result.get("speedup")
+        speedup_str = f"{speedup:.2f}x" if speedup is not None else "-"
+        # Acima de 1x, mais rápido que a referência
+        ratio = "-"
+        if name in baseline and result["seconds"] > 0:
+            ratio = f"{baseline[name]['seconds'] / result['seconds']:.2f}x"
+        print(
+            f"{name:<28}{result['seconds'] * 1000:>12.1f}{load_str:>14}"
+            f"{speedup_str:>10}{ratio:>10}"
+        )
+
+
+def startup_regressions(
+    results: dict[str, dict], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    slower = []
+    for name, result in results.items():
+        if name in baseline and result["seconds"] > baseline[name]["seconds"] * (1 + tolerance):
+            slower.append(name)
+    return slower
+
+
+def print_results(results: dict[str, dict], baseline: dict[str, dict]):
+    print(f"{'caso':<24}{'ops':>10}{'ops/s':>14}{'pico (KiB)':>12}{'vs base':>10}")
+    for name, result in results.items():
+        peak = result.get("peak_bytes")
+        peak_str = f"{peak // 1024}" if peak is not None else "-"
+        ratio = "-"
+        if name in baseline and baseline[name]["rate"] > 0:
+            ratio = f"{result['rate'] / baseline[name]['rate']:.2f}x"
+        print(f"{name:<24}{result['ops']:>10}{result['rate']:>14.0f}{peak_str:>12}{ratio:>10}")
+
+
+def regressions(
+    results: dict[str, dict], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    slower = []
+    for name, result in results.items():
+        if name in baseline and result["rate"] < baseline[name]["rate"] * (1 - tolerance):
+            slower.append(name)
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cargas sintéticas e benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Gera uma carga sintética")
+    generate.add_argument("directory", help="Diretório de saída")
+    generate.add_argument("--processes", type=int, default=1000)
+    generate.add_argument("--seed", type=int, default=0)
+    generate.add_argument("--resource-usage", type=float, default=0.2)
+    generate.add_argument("--file-ops", type=float, default=1.0)
+    generate.add_argument("--disk-size", type=int, default=1024)
+
+    run = commands.add_parser("run", help="Mede o desempenho do simulador")
+    run.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--resource-usage", type=float, default=0.2)
+    run.add_argument("--baseline", help="Resultados de referência (JSON)")
+    run.add_argument("--save", help="Salva os resultados (JSON)")
+    run.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Queda de desempenho aceita em relação à referência",
+    )
+
+    startup = commands.add_parser(
+        "startup", help="Mede o tempo de execução de casos pequenos (texto e compilado)"
+    )
+    startup.add_argument("--sizes", type=int, nargs="*", default=[10, 100])
+    startup.add_argument("--seed", type=int, default=0)
+    startup.add_argument(
+        "--samples", default="samples", help="Diretório dos exemplos (padrão: samples)"
+    )
+    startup.add_argument(
+        "--repeat", type=int, default=10, help="Execuções de cada caso (vale a menor)"
+    )
+    startup.add_argument("--baseline", help="Resultados de referência (JSON)")
+    startup.add_argument(
+        "--baseline-tree",
+        help="Diretório de outra cópia do simulador (ex.: a original), medida nos casos em texto",
+    )
+    startup.add_argument("--save", help="Salva os resultados (JSON)")
+    startup.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Aumento de tempo aceito em relação à referência",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        config = WorkloadConfig(
+            processes=args.processes,
+            seed=args.seed,
+            resource_usage=args.resource_usage,
+            file_ops=args.file_ops,
+            disk_size=args.disk_size,
+        )
+        process_path, ops_path = write_workload(args.directory, config)
+        print(f"Gerados {process_path} e {ops_path}")
+        return
+
+    baseline: dict[str, dict] = {}
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.command == "startup":
+        config = WorkloadConfig(seed=args.seed)
+        results, measured = run_startup(
+            args.sizes, config, args.samples, args.repeat, args.baseline_tree
+        )
+        baseline.update(measured)
+        print_startup(results, baseline)
+        if args.save is not None:
+            with open(args.save, "w") as f:
+                json.dump(results, f, indent=2)
+
+        slower = startup_regressions(results, baseline, args.tolerance)
+        if len(slower) > 0:
+            print(f"Regressões de desempenho: {', '.join(slower)}")
+            sys.exit(1)
+        return
+
+    config = WorkloadConfig(seed=args.seed, resource_usage=args.resource_usage)
+    results = run_benchmarks(args.sizes, config)
+
+    print_results(results, baseline)
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    slower = regressions(results, baseline, args.tolerance)
+    if len(slower) > 0:
+        print(f"Regressões de desempenho: {', '.join(slower)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from simos.differential import (
+    compare,
+    config_engine,
+    import_engine,
+    reference_engine,
+    timed_run,
+)
+from simos.loader import load_operations, load_processes
+from simos.workload import WorkloadConfig, write_workload
+
+
+def option(value: str) -> tuple[str, object]:
+    """Parâmetro chave=valor; o valor é lido como JSON se possível"""
+    key, separator, text = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"esperado chave=valor: {value}")
+    try:
+        return key, json.loads(text)
+    except json.JSONDecodeError:
+        return key, text
+
+
+def seconds(value) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+def sample_traces(directory: str) -> list[tuple[str, str, str]]:
+    traces = []
+    if not os.path.isdir(directory):
+        return traces
+    for name in sorted(os.listdir(directory)):
+        process_path = os.path.join(directory, name, "processes.txt")
+        ops_path = os.path.join(directory, name, "files.txt")
+        if os.path.exists(process_path) and os.path.exists(ops_path):
+            traces.append((f"{directory}/{name}", process_path, ops_path))
+    return traces
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compara um motor candidato com o motor de referência (cópia "
+            "congelada do simulador original), tick a tick, e mede o ganho de "
+            "desempenho"
+        )
+    )
+    parser.add_argument(
+        "--candidate",
+        type=option,
+        nargs="+",
+        default=[],
+        metavar="CHAVE=VALOR",
+        help="Parâmetros do candidato (campos de SimulationConfig e tick), ex.: tick=true",
+    )
+    parser.add_argument(
+        "--reference",
+        type=option,
+        nargs="*",
+        metavar="CHAVE=VALOR",
+        help=(
+            "Usa o simulador atual como referência, com estes parâmetros, no "
+            "lugar do motor congelado"
+        ),
+    )
+    parser.add_argument(
+        "--original",
+        action="store_true",
+        help=(
+            "Motor congelado sem as correções da promoção e do desbloqueio "
+            "por memória (diverge de propósito do simulador atual)"
+        ),
+    )
+    parser.add_argument(
+        "--engine", help="Candidato dado como módulo:função (no lugar de --candidate)"
+    )
+    parser.add_argument(
+        "--trace",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("PROCESS_FILE", "OPS_FILE"),
+        help="Traço a comparar (pode ser repetido)",
+    )
+    parser.add_argument(
+        "--samples", default="samples", help="Diretório dos exemplos (padrão: samples)"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="*",
+        default=[100, 1000],
+        help="Quantidade de processos das cargas geradas",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Salva os resultados (JSON)")
+    args = parser.parse_args()
+
+    if args.reference is not None:
+        reference = config_engine(dict(args.reference))
+    else:
+        reference = reference_engine(not args.original)
+    if args.engine is not None:
+        candidate = import_engine(args.engine)
+    else:
+        candidate = config_engine(dict(args.candidate))
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        traces = sample_traces(args.samples)
+        traces += [(f"{p} {o}", p, o) for p, o in args.trace]
+        for size in args.sizes:
+            config = WorkloadConfig(processes=size, seed=args.seed)
+            process_path, ops_path = write_workload(f"{directory}/{size}", config)
+            traces.append((f"gerado/{size}", process_path, ops_path))
+
+        print(f"{'traço':<28}{'processos':>10}{'ticks':>8}{'ref (s)':>10}{'cand (s)':>10}{'ganho':>8}")
+        for name, process_path, ops_path in traces:
+            processes = load_processes(process_path)
+            operations = load_operations(ops_path, processes)
+
+            divergence, ticks = compare(processes, operations, reference, candidate)
+            reference_seconds = timed_run(reference, processes, operations)
+            candidate_seconds = timed_run(candidate, processes, operations)
+            if reference_seconds is None or candidate_seconds is None:
+                # Um motor que falha não tem tempo a medir
+                speedup = None
+            else:
+                speedup = reference_seconds / candidate_seconds if candidate_seconds else 0.0
+
+            print(
+                f"{name:<28}{len(processes):>10}{ticks:>8}{seconds(reference_seconds):>10}"
+                f"{seconds(candidate_seconds):>10}"
+                f"{'-' if speedup is None else f'{speedup:.2f}x':>8}"
+            )
+            if divergence is not None:
+                print(
+                    f"  divergência no tick {divergence.tick} ({divergence.kind}): "
+                    f"{divergence.detail}"
+                )
+
+            results.append(
+                {
+                    "trace": name,
+                    "processes": len(processes),
+                    "ticks": ticks,
+                    "reference_seconds": reference_seconds,
+                    "candidate_seconds": candidate_seconds,
+                    "speedup": speedup,
+                    "divergence": divergence._asdict() if divergence is not None else None,
+                }
+            )
+
+    if args.save is not None:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    diverged = [result["trace"] for result in results if result["divergence"] is not None]
+    if len(diverged) > 0:
+        print(f"Traços com divergência: {', '.join(diverged)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
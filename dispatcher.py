@@ -1,112 +1,368 @@
 import argparse
-import time
+import sys
 
+# Os demais módulos são importados só quando usados: em execuções curtas
+# o tempo de início do interpretador e dos imports domina
 
-from simos.managers.process import (
-    PCB,
-    CreateFileInstruction,
-    DeleteFileInstruction,
-    ProcessManager,
-    MemoryManager,
-    ResourceManager,
-)
-from simos.managers.resource import Printer, Scanner, Sata, Modem, Resource
-from simos.managers.storage import FileManager
 
+def write_fragmentation(samples, path: str):
+    import csv
 
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        header = ["tick"]
+        for area in ("realtime", "user", "disk"):
+            header += [f"{area}_free", f"{area}_largest", f"{area}_ratio"]
+        writer.writerow(header)
 
-def main():
-    parser = argparse.ArgumentParser()
+        for sample in samples:
+            row = [sample.tick]
+            for area in (sample.realtime, sample.user, sample.disk):
+                row += [area.free, area.largest, f"{area.ratio:.3f}"]
+            writer.writerow(row)
+
+
+def write_disk_usage(samples, path: str):
+    import csv
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["tick", "used", "files", "free_extents", "largest_free"])
+        for tick, usage in samples:
+            writer.writerow([tick, *usage])
+
+
+def write_disk_changes(changes, path: str):
+    import csv
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["tick", "start", "end", "file"])
+        for tick, start, end, name in changes:
+            writer.writerow([tick, start, end, name if name is not None else ""])
+
+
+def print_disk_map(mode: str, runs, blocks=None):
+    """Mapa do disco bloco a bloco (`blocks`, ou montado a partir dos
+    trechos) ou em trechos (arquivo, início, tamanho)"""
+    if mode == "full":
+        if blocks is None:
+            blocks = []
+            for name, _, length in runs:
+                blocks += [name] * length
+        print(f"Mapa do disco: {blocks}")
+    elif mode == "rle":
+        print(f"Mapa do disco (trechos): {runs}")
+
+
+def replay(cache, key: str, cached, args):
+    """Repete as saídas de uma execução guardada no cache"""
+    sys.stdout.write(cached.warnings)
+    if args.log != "quiet":
+        if args.log_file is not None:
+            with open(args.log_file, "w") as f:
+                cache.copy_log(key, f)
+        else:
+            cache.copy_log(key, sys.stdout)
+
+    if args.metrics_json is not None:
+        cached.metrics.write_json(args.metrics_json)
+    if args.metrics_csv is not None:
+        cached.metrics.write_csv(args.metrics_csv)
+    print_disk_map(args.disk_map, cached.disk)
+
+
+def compile_main(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        prog="dispatcher.py compile",
+        description="Converte os arquivos de entrada em um traço compilado (binário)",
+    )
     parser.add_argument("process_file", help="Arquivo de processos")
     parser.add_argument("ops_file", help="Arquivo de operações")
+    parser.add_argument("output", help="Arquivo do traço compilado")
+    args = parser.parse_args(argv)
+
+    from simos.tracefile import compile_trace
+
+    compile_trace(args.process_file, args.ops_file, args.output)
+
+
+def main():
+    if sys.argv[1:2] == ["compile"]:
+        compile_main(sys.argv[2:])
+        return
+
+    from simos.managers.placement import POLICIES
+
+    parser = argparse.ArgumentParser(
+        epilog="Use 'dispatcher.py compile' para gerar um traço compilado."
+    )
+    parser.add_argument("process_file", help="Arquivo de processos (ou traço compilado)")
+    parser.add_argument(
+        "ops_file", nargs="?", help="Arquivo de operações (omitido com traço compilado)"
+    )
+    parser.add_argument(
+        "--tick",
+        action="store_true",
+        help="Simula todos os ticks, sem pular os que não têm eventos",
+    )
+    parser.add_argument(
+        "--log",
+        choices=["text", "quiet", "jsonl"],
+        default="text",
+        help="Formato do registro de eventos (texto, nenhum ou JSON por linha)",
+    )
+    parser.add_argument(
+        "--log-file", help="Arquivo do registro de eventos (padrão: saída padrão)"
+    )
+    parser.add_argument(
+        "--snapshot-every",
+        type=int,
+        help="Grava um snapshot do simulador a cada N ticks",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        default="snapshots",
+        help="Diretório dos snapshots (padrão: snapshots)",
+    )
+    parser.add_argument("--resume", help="Retoma a simulação a partir de um snapshot")
+    parser.add_argument(
+        "--disk-image",
+        help="Imagem de disco persistente; criada a partir do arquivo de operações se não existir",
+    )
+    parser.add_argument("--cpus", type=int, default=1, help="CPUs simuladas (padrão: 1)")
+    parser.add_argument(
+        "--per-cpu-queues",
+        action="store_true",
+        help="Uma fila READY por CPU, com roubo de trabalho (padrão: filas compartilhadas)",
+    )
+    parser.add_argument(
+        "--placement",
+        choices=list(POLICIES),
+        default="first-fit",
+        help="Política de posicionamento da memória e do disco (padrão: first-fit)",
+    )
+    parser.add_argument(
+        "--compaction",
+        action="store_true",
+        help="Compacta a memória quando um processo bloqueado só cabe juntando os trechos livres",
+    )
+    parser.add_argument(
+        "--max-compaction-cost",
+        type=int,
+        help="Máximo de blocos movidos por compactação (padrão: sem limite)",
+    )
+    parser.add_argument(
+        "--fragmentation",
+        help="Salva em CSV a fragmentação da memória e do disco a cada tick",
+    )
+    parser.add_argument(
+        "--disk-map",
+        choices=["full", "rle", "none"],
+        default="full",
+        help="Mapa do disco ao final: bloco a bloco, em trechos (arquivo, início, tamanho) ou nenhum",
+    )
+    parser.add_argument(
+        "--disk-usage",
+        help="Salva em CSV a ocupação do disco (blocos, arquivos, trechos livres) a cada tick",
+    )
+    parser.add_argument(
+        "--disk-changes",
+        help="Salva em CSV os trechos do disco alterados a cada tick",
+    )
+    parser.add_argument("--metrics-json", help="Salva as métricas da execução em JSON")
+    parser.add_argument("--metrics-csv", help="Salva as métricas de cada processo em CSV")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Mede chamadas, blocos e tempo de cada gerenciador e mostra uma tabela ao final",
+    )
+    parser.add_argument("--profile-pstats", help="Salva as medições no formato do pstats")
+    parser.add_argument(
+        "--profile-folded", help="Salva as pilhas medidas no formato de flamegraph"
+    )
+    parser.add_argument(
+        "--cache",
+        help="Diretório do cache de resultados: execuções com as mesmas entradas e parâmetros são reaproveitadas",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="Tamanho máximo do cache em MB (padrão: 256)",
+    )
     args = parser.parse_args()
+    if args.disk_image is not None and (
+        args.snapshot_every is not None or args.resume is not None
+    ):
+        # Os snapshots não guardam o disco em imagem, que continua mudando
+        # depois deles
+        parser.error("--disk-image não pode ser usado com --snapshot-every ou --resume")
+
+    from simos.tracefile import is_trace_file
 
-    # Lê processos
-    processes: dict[int, PCB] = {}
-    resources: set[Resource] = set()
-    with open(args.process_file) as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = [p.strip() for p in line.split(",")]
-            init, prio, cpu, blocks, prn, scn, modem, disk = parts
-            pid = len(processes)
-            pcb = PCB(
-                pid=pid,
-                priority=int(prio),
-                init_duration=int(init),
-                cpu_duration=int(cpu),
-                memory_offset=0,
-                allocated_blocks=int(blocks),
+    compiled = is_trace_file(args.process_file)
+    if not compiled and args.ops_file is None:
+        parser.error("o arquivo de operações é obrigatório com traços em texto")
+    inputs = [args.process_file] if compiled else [args.process_file, args.ops_file]
+
+    import contextlib
+    import io
+
+    from simos.events import JsonLog, QuietLog, TextLog
+    from simos.simulation import Simulation, SimulationConfig
+
+    config = SimulationConfig(
+        disk_image=args.disk_image,
+        cpus=args.cpus,
+        per_cpu_queues=args.per_cpu_queues,
+        placement=args.placement,
+        compaction=args.compaction,
+        max_compaction_cost=args.max_compaction_cost,
+    )
+
+    # O cache só vale para execuções que dependem apenas das entradas e
+    # dos parâmetros, e cujas saídas ele guarda
+    cache = key = None
+    if args.cache is not None:
+        uncached = {
+            "--resume": args.resume,
+            "--snapshot-every": args.snapshot_every,
+            "--disk-image": args.disk_image,
+            "--fragmentation": args.fragmentation,
+            "--disk-usage": args.disk_usage,
+            "--disk-changes": args.disk_changes,
+            "--profile": args.profile or args.profile_pstats or args.profile_folded,
+        }
+        options = [name for name, value in uncached.items() if value]
+        if len(options) > 0:
+            print(f"Cache ignorado com {', '.join(options)}", file=sys.stderr)
+        else:
+            from simos.cache import ResultCache, cache_key
+
+            cache = ResultCache(args.cache, args.cache_size << 20)
+            key = cache_key(inputs, config, args.tick, args.log)
+            cached = cache.get(key)
+            if cached is not None:
+                replay(cache, key, cached, args)
+                return
+
+    # Lê os arquivos de entrada em colunas. Os PCBs só são criados
+    # quando o processo está para ser admitido.
+    warnings = io.StringIO()
+    with contextlib.redirect_stdout(warnings):
+        if compiled:
+            from simos.tracefile import load_trace
+
+            processes, operations = load_trace(args.process_file)
+        else:
+            from simos.loader import load_operations, load_processes
+
+            processes = load_processes(args.process_file)
+            operations = load_operations(args.ops_file, processes)
+    sys.stdout.write(warnings.getvalue())
+
+    log_stream = sys.stdout
+    if args.log_file is not None:
+        log_stream = open(args.log_file, "w")
+
+    cache_file = None
+    if cache is not None:
+        from simos.cache import TeeStream
+
+        entry = cache.begin()
+        cache_file = open(cache.log_path(entry), "w")
+        log_stream = TeeStream(log_stream, cache_file)
+
+    if args.log == "quiet":
+        log = QuietLog()
+    elif args.log == "jsonl":
+        log = JsonLog(log_stream)
+    else:
+        log = TextLog(log_stream)
+
+    if args.resume is not None:
+        from simos.snapshot import load_snapshot
+
+        simulation = load_snapshot(args.resume, processes, operations, log)
+    else:
+        simulation = Simulation(processes, operations, log, args.tick, config)
+    try:
+        if args.fragmentation is not None:
+            simulation.track_fragmentation()
+        if args.disk_usage is not None:
+            simulation.track_disk_usage()
+        if args.disk_changes is not None:
+            simulation.track_disk_changes()
+        if (
+            args.metrics_json or args.metrics_csv or cache is not None
+        ) and simulation.manager.metrics is None:
+            simulation.collect_metrics()
+
+        profiler = None
+        profiling = contextlib.nullcontext()
+        if args.profile or args.profile_pstats or args.profile_folded:
+            from simos.profiling import Profiler
+
+            profiler = Profiler()
+            profiling = profiler.attached(log)
+
+        completed = False
+        with profiling:
+            try:
+                if args.snapshot_every is not None:
+                    from simos.snapshot import run_with_snapshots
+
+                    run_with_snapshots(simulation, args.snapshot_every, args.snapshot_dir)
+                else:
+                    simulation.run()
+                completed = True
+            finally:
+                log.close()
+                if cache_file is not None:
+                    cache_file.close()
+                    log_stream = log_stream.first
+                    if not completed:
+                        cache.discard(entry)
+                if log_stream is not sys.stdout:
+                    log_stream.close()
+
+        if cache is not None:
+            from simos.cache import CachedRun
+
+            run = CachedRun(
+                warnings.getvalue(),
+                simulation.manager.metrics,
+                simulation.storage.run_lengths(),
             )
+            cache.commit(key, entry, run)
+
+        if profiler is not None:
+            if args.profile:
+                profiler.print_table(sys.stderr)
+            if args.profile_pstats is not None:
+                profiler.dump_pstats(args.profile_pstats)
+            if args.profile_folded is not None:
+                profiler.dump_folded(args.profile_folded)
+
+        if args.fragmentation is not None:
+            write_fragmentation(simulation.fragmentation, args.fragmentation)
+        if args.disk_usage is not None:
+            write_disk_usage(simulation.disk_usage, args.disk_usage)
+        if args.disk_changes is not None:
+            write_disk_changes(simulation.disk_changes, args.disk_changes)
+        if args.metrics_json is not None:
+            simulation.manager.metrics.write_json(args.metrics_json)
+        if args.metrics_csv is not None:
+            simulation.manager.metrics.write_csv(args.metrics_csv)
 
-            # Não ficou claro na especificação
-
-            # Assumimos que 0 é um código "morto" e implica a não
-            # utilização da impressora ou do Sata, isso é inferido
-            # pelos exemplos aprensentados
-
-            # Caso contrário, o código será aquilo que estiver nessa
-            # coluna
-            if prn != "0":
-                pcb.use_resources.append(Printer(prn))
-            if scn == "1":
-                pcb.use_resources.append(Scanner())
-            if modem == "1":
-                pcb.use_resources.append(Modem())
-            if disk != "0":
-                pcb.use_resources.append(Sata(disk))
-
-            if len(pcb.use_resources) > 0:
-                resources.add(pcb.use_resources[0])
-
-            if len(pcb.use_resources) > 1:
-                raise ValueError("Cada processo deve utilizar um recurso somente.")
-
-            processes[pid] = pcb
-
-    # Lê operações de arquivos
-    with open(args.ops_file) as f:
-        total_blocks = int(f.readline().strip())
-        n_segments = int(f.readline().strip())
-
-        initial_files: list[tuple[str, int, int]] = []
-        for _ in range(n_segments):
-            line = f.readline().strip()
-            filename, address, size = [p.strip() for p in line.split(",")]
-            initial_files.append((filename, int(address), int(size)))
-
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            pid_str, op_code, filename, *rest = [p.strip() for p in line.split(",")]
-            pid = int(pid_str)
-            if op_code == "0":
-                blocks_n = int(rest[0])
-                instr = CreateFileInstruction(filename, blocks_n)
-            else:
-                instr = DeleteFileInstruction(filename)
-            if pid in processes:
-                processes[pid].instructions.append(instr)
-            else:
-                print(f"Processo {pid} não existe")
-
-    mm = MemoryManager()
-    rm = ResourceManager(resources)
-    sm = FileManager(total_blocks, initial_files)
-    pm = ProcessManager(mm, rm, sm)
-    for pcb in processes.values():
-        pm.add_process(pcb)
-
-    clock = 1
-    while len(pm.terminated) < len(processes) and clock < 100:
-        pm.run(clock)
-        clock += 1
-        # time.sleep(1)
-    
-    print(f"Mapa do disco: {sm.blocks}")
+        if args.disk_map == "full":
+            print_disk_map("full", None, simulation.storage.blocks)
+        else:
+            print_disk_map(args.disk_map, simulation.storage.run_lengths())
+    finally:
+        # Grava o disco (com --disk-image) mesmo se a simulação falhar
+        simulation.storage.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+
+from simos.service import SimulationService
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Serviço de simulação: lê pedidos JSON (um por linha) e devolve os "
+            "eventos e o resultado de cada um"
+        )
+    )
+    parser.add_argument(
+        "--socket", help="Atende em um socket Unix (padrão: entrada e saída padrão)"
+    )
+    parser.add_argument("--workers", type=int, help="Simulações em paralelo")
+    args = parser.parse_args()
+
+    service = SimulationService(args.workers)
+    try:
+        if args.socket is not None:
+            asyncio.run(service.serve_socket(args.socket))
+        else:
+            asyncio.run(service.serve_stdio())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
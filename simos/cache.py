@@ -0,0 +1,170 @@
+import functools
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import zlib
+from typing import NamedTuple, Optional, TextIO
+
+from simos.metrics import MetricsCollector
+from simos.simulation import SimulationConfig
+
+
+# Muda quando o formato das entradas muda, invalidando o que já estava no
+# cache. Mudanças no código do simulador já entram na chave (ver
+# `source_digest`).
+VERSION = b"simos-cache-4"
+
+LOG_FILE = "log"
+RESULT_FILE = "result"
+
+
+class CachedRun(NamedTuple):
+    # Avisos impressos ao ler os arquivos de entrada
+    warnings: str
+    metrics: MetricsCollector
+    # Mapa final do disco em trechos (ver `FileManager.run_lengths`)
+    disk: list[tuple[Optional[str], int, int]]
+
+
+@functools.lru_cache(maxsize=None)
+def source_digest() -> bytes:
+    """Hash do código do pacote `simos`, para que uma mudança de
+    comportamento invalide as entradas mesmo sem mudar `VERSION`"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if d != "__pycache__")
+        for name in sorted(files):
+            if not name.endswith(".py"):
+                continue
+            path = os.path.join(directory, name)
+            digest.update(os.path.relpath(path, root).encode() + b"\0")
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.digest()
+
+
+def cache_key(
+    inputs: list[str],
+    config: SimulationConfig,
+    tick: bool,
+    log_format: str,
+) -> str:
+    """Hash do conteúdo dos arquivos de entrada (os dois traços em texto
+    ou o traço compilado), do código do simulador e dos parâmetros que
+    mudam o resultado ou o registro de eventos"""
+    digest = hashlib.sha256(VERSION)
+    digest.update(source_digest())
+    for path in inputs:
+        digest.update(b"\0file\0")
+        with open(path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+
+    options = sorted(config._asdict().items())
+    digest.update(repr((options, tick, log_format)).encode())
+    return digest.hexdigest()
+
+
+class TeeStream:
+    """Escreve o texto recebido em dois arquivos"""
+
+    def __init__(self, first: TextIO, second: TextIO):
+        self.first = first
+        self.second = second
+
+    def write(self, text: str) -> int:
+        self.first.write(text)
+        return self.second.write(text)
+
+    def flush(self):
+        self.first.flush()
+        self.second.flush()
+
+
+class ResultCache:
+    """Resultados de execuções já feitas, em `directory`, indexados por
+    `cache_key`.
+
+    Cada entrada é um diretório com o registro de eventos como foi
+    escrito e o resultado (avisos, métricas e mapa final do disco em
+    trechos) compactado. Quando o total passa de `max_bytes`, as entradas
+    usadas há mais tempo são apagadas; o uso é marcado pela data de
+    modificação do resultado.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 << 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[CachedRun]:
+        result = os.path.join(self.path(key), RESULT_FILE)
+        try:
+            with open(result, "rb") as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error):
+            return None
+        try:
+            run = pickle.loads(data)
+        except (pickle.UnpicklingError, AttributeError, ImportError, EOFError):
+            # Entrada corrompida ou gravada por outra versão do código (ex.:
+            # uma classe que mudou de nome ou de módulo): vale como ausente
+            # e é trocada pelo resultado da nova execução
+            return None
+        os.utime(result)
+        return run
+
+    def copy_log(self, key: str, stream: TextIO):
+        with open(os.path.join(self.path(key), LOG_FILE)) as f:
+            shutil.copyfileobj(f, stream)
+
+    def begin(self) -> str:
+        """Diretório temporário de uma nova entrada (ver `commit`)"""
+        return tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+
+    def log_path(self, entry: str) -> str:
+        return os.path.join(entry, LOG_FILE)
+
+    def commit(self, key: str, entry: str, run: CachedRun):
+        with open(os.path.join(entry, RESULT_FILE), "wb") as f:
+            f.write(zlib.compress(pickle.dumps(run, pickle.HIGHEST_PROTOCOL)))
+
+        target = self.path(key)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(entry, target)
+        self.evict(keep=key)
+
+    def discard(self, entry: str):
+        shutil.rmtree(entry, ignore_errors=True)
+
+    def evict(self, keep: Optional[str] = None):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+            path = self.path(name)
+            try:
+                size = sum(
+                    os.path.getsize(os.path.join(path, file)) for file in os.listdir(path)
+                )
+                used = os.path.getmtime(os.path.join(path, RESULT_FILE))
+            except OSError:
+                continue
+            entries.append((used, name, size))
+            total += size
+
+        entries.sort()
+        for _, name, size in entries:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(self.path(name), ignore_errors=True)
+            total -= size
@@ -0,0 +1,230 @@
+import importlib
+import itertools
+import time
+from typing import Callable, NamedTuple, Optional
+
+from simos.events import Event, EventLog, QuietLog, render
+from simos.loader import OperationTrace, ProcessTrace
+from simos.managers.process import State
+from simos.reference import ReferenceSimulation
+from simos.simulation import Simulation, make_config
+
+
+# Cria a simulação de um motor a partir dos traços e do registro de
+# eventos. O objeto devolvido precisa ter a interface de `Simulation`
+# (step, manager, memory e storage).
+Engine = Callable[[ProcessTrace, OperationTrace, EventLog], Simulation]
+
+
+def reference_engine(fixes: bool = True) -> Engine:
+    """Motor de referência congelado (`simos.reference`), com ou sem as
+    correções que mudaram o comportamento do simulador"""
+
+    def engine(processes: ProcessTrace, operations: OperationTrace, log: EventLog):
+        return ReferenceSimulation(processes, operations, log, fixes)
+
+    return engine
+
+
+def config_engine(options: dict) -> Engine:
+    """Simulador atual com parâmetros trocados (os campos de
+    `SimulationConfig`, e `tick` para simular todos os ticks)"""
+    options = dict(options)
+    tick = bool(options.pop("tick", False))
+    config = make_config(options)
+
+    def engine(processes: ProcessTrace, operations: OperationTrace, log: EventLog):
+        return Simulation(processes, operations, log, tick, config)
+
+    return engine
+
+
+def import_engine(path: str) -> Engine:
+    """Motor dado por "módulo:função" """
+    module, _, name = path.partition(":")
+    if not name:
+        raise ValueError(f"Motor deve ser dado como módulo:função: {path}")
+    return getattr(importlib.import_module(module), name)
+
+
+class CaptureLog(EventLog):
+    """Guarda os eventos em memória até serem lidos com `take`"""
+
+    def __init__(self):
+        super().__init__()
+        self.events: list[Event] = []
+
+    def write(self, events: list[Event]):
+        self.events.extend(events)
+
+    def take(self) -> list[Event]:
+        self.flush()
+        events, self.events = self.events, []
+        return events
+
+
+def runs(values) -> list[tuple]:
+    """Trechos (valor, início, tamanho) de uma sequência"""
+    result = []
+    address = 0
+    for value, group in itertools.groupby(values):
+        length = len(list(group))
+        result.append((value, address, length))
+        address += length
+    return result
+
+
+def merge_runs(values: list[tuple]) -> list[tuple]:
+    """Junta trechos vizinhos de mesmo valor (dois arquivos de mesmo nome
+    lado a lado são um trecho só no mapa de blocos)"""
+    result: list[tuple] = []
+    for value, address, length in values:
+        if len(result) > 0 and result[-1][0] == value:
+            result[-1] = (value, result[-1][1], result[-1][2] + length)
+        else:
+            result.append((value, address, length))
+    return result
+
+
+def capture_state(simulation: Simulation) -> dict:
+    """Estado comparável de uma simulação entre dois ticks: estados dos
+    processos, terminados, mapa da memória, mapa do disco e metadados"""
+    pm = simulation.manager
+    memory = simulation.memory.memory
+    storage = simulation.storage
+
+    # Os terminados podem ou não ter saído da tabela (compactação), então
+    # ficam só na lista de terminados; os ainda não admitidos podem ou não
+    # ter entrado nela (criação na chegada)
+    active = getattr(pm, "active_processes", None)
+    processes = {
+        process.pid: process.state.name
+        for process in (active() if active is not None else pm.process_table.values())
+        if process.state not in (State.NEW, State.TERMINATED)
+    }
+    return {
+        "processes": dict(sorted(processes.items())),
+        "terminated": list(pm.terminated),
+        "memory": runs(memory),
+        "disk": (
+            merge_runs(storage.run_lengths())
+            if hasattr(storage, "run_lengths")
+            else runs(storage.blocks)
+        ),
+        "metadata": {
+            name: (file.owner, file.address, file.size)
+            for name, file in sorted(storage.metadata.items())
+        },
+    }
+
+
+class Divergence(NamedTuple):
+    tick: int
+    # "events", "state", "end" ou "error" (um dos motores falhou)
+    kind: str
+    detail: str
+
+
+def first_difference(reference, candidate) -> str:
+    """Descreve a primeira diferença entre dois valores do estado"""
+    if isinstance(reference, dict) and isinstance(candidate, dict):
+        for key in sorted(set(reference) | set(candidate), key=repr):
+            if reference.get(key) != candidate.get(key):
+                return f"{key!r}: {reference.get(key)!r} != {candidate.get(key)!r}"
+    if isinstance(reference, list) and isinstance(candidate, list):
+        for index, (a, b) in enumerate(itertools.zip_longest(reference, candidate)):
+            if a != b:
+                return f"posição {index}: {a!r} != {b!r}"
+    return f"{reference!r} != {candidate!r}"
+
+
+def describe_events(reference: list[Event], candidate: list[Event]) -> str:
+    for index, (a, b) in enumerate(itertools.zip_longest(reference, candidate)):
+        if a != b:
+            expected = render(a).strip() if a is not None else "(nenhum)"
+            found = render(b).strip() if b is not None else "(nenhum)"
+            return f"evento {index} do tick: esperado {expected!r}, obtido {found!r}"
+    return ""
+
+
+def compare(
+    processes: ProcessTrace,
+    operations: OperationTrace,
+    reference: Engine,
+    candidate: Engine,
+) -> tuple[Optional[Divergence], int]:
+    """Roda os dois motores lado a lado e compara os eventos e o estado
+    a cada tick que os dois simularam (um motor pode pular ticks sem
+    eventos que o outro simula).
+
+    Retorna a primeira divergência (ou None) e os ticks comparados."""
+    reference_log, candidate_log = CaptureLog(), CaptureLog()
+    simulations = [
+        reference(processes, operations, reference_log),
+        candidate(processes, operations, candidate_log),
+    ]
+    logs = [reference_log, candidate_log]
+    alive = [True, True]
+    # Eventos desde a última comparação
+    pending: list[list[Event]] = [[], []]
+    compared = 0
+
+    try:
+        while alive[0] or alive[1]:
+            # Avança o motor que está atrás (ou o único que ainda roda)
+            times = [simulation.manager.time for simulation in simulations]
+            if alive[0] and (not alive[1] or times[0] <= times[1]):
+                behind = 0
+            else:
+                behind = 1
+            try:
+                alive[behind] = simulations[behind].step()
+            except Exception as e:
+                engine = "referência" if behind == 0 else "candidato"
+                tick = simulations[behind].manager.time
+                return Divergence(tick, "error", f"{engine} falhou: {e!r}"), compared
+            pending[behind].extend(logs[behind].take())
+
+            times = [simulation.manager.time for simulation in simulations]
+            if alive[0] != alive[1] or times[0] != times[1]:
+                continue
+
+            tick = times[0]
+            if pending[0] != pending[1]:
+                detail = describe_events(pending[0], pending[1])
+                return Divergence(tick, "events", detail), compared
+            pending = [[], []]
+
+            states = [capture_state(simulation) for simulation in simulations]
+            for key in states[0]:
+                if states[0][key] != states[1][key]:
+                    detail = f"{key}: {first_difference(states[0][key], states[1][key])}"
+                    return Divergence(tick, "state", detail), compared
+            compared += 1
+
+        times = [simulation.manager.time for simulation in simulations]
+        if times[0] != times[1] or pending[0] != pending[1]:
+            detail = (
+                f"referência terminou no tick {times[0]}, candidato no tick {times[1]}"
+            )
+            return Divergence(max(times), "end", detail), compared
+        return None, compared
+    finally:
+        for simulation in simulations:
+            simulation.storage.close()
+
+
+def timed_run(
+    engine: Engine, processes: ProcessTrace, operations: OperationTrace
+) -> Optional[float]:
+    """Segundos de uma execução completa, sem registro de eventos (None se
+    o motor falhar)"""
+    simulation = engine(processes, operations, QuietLog())
+    try:
+        start = time.perf_counter()
+        simulation.run()
+        return time.perf_counter() - start
+    except Exception:
+        return None
+    finally:
+        simulation.storage.close()
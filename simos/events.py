@@ -0,0 +1,141 @@
+import sys
+from enum import IntEnum
+from typing import NamedTuple, Optional, TextIO
+
+
+class EventKind(IntEnum):
+    ADMIT = 0
+    BLOCK_MEMORY = 1
+    BLOCK_RESOURCE = 2
+    UNBLOCK = 3
+    PROMOTE = 4
+    PREEMPT = 5
+    COMPLETE = 6
+    DISPATCH = 7
+    INSTRUCTION = 8
+    CREATE_FILE = 9
+    CREATE_FILE_ERROR = 10
+    DELETE_FILE = 11
+    DELETE_FILE_ERROR = 12
+    COMPACT = 13
+
+
+class Event(NamedTuple):
+    kind: EventKind
+    time: int
+    pid: int
+    data: tuple
+
+
+# Quantidade de eventos acumulados antes de escrever
+BUFFER_SIZE = 4096
+
+
+class EventLog:
+    """Registro dos eventos da simulação.
+
+    Os eventos ficam em um buffer e são entregues em lotes para `write`,
+    que cada tipo de registro implementa.
+    """
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE):
+        self.buffer: list[Event] = []
+        self.buffer_size = buffer_size
+
+    def record(self, kind: EventKind, time: int, pid: int, *data):
+        self.buffer.append(Event(kind, time, pid, data))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.buffer) > 0:
+            self.write(self.buffer)
+            self.buffer = []
+
+    def write(self, events: list[Event]):
+        raise NotImplementedError()
+
+    def close(self):
+        self.flush()
+
+
+class QuietLog(EventLog):
+    """Descarta todos os eventos"""
+
+    def record(self, kind: EventKind, time: int, pid: int, *data):
+        pass
+
+
+# Formato de cada evento na saída em texto. Os campos de `data` são
+# referenciados pela posição.
+TEMPLATES: dict[EventKind, str] = {
+    EventKind.ADMIT: "(time={time}) Processo {pid} pronto.\n",
+    EventKind.BLOCK_MEMORY: "(time={time}) Bloqueando processo {pid}, sem memória disponível.\n",
+    EventKind.BLOCK_RESOURCE: "(time={time}) Bloqueando processo {pid}, sem recursos disponíveis.\n",
+    EventKind.UNBLOCK: "(time={time}) Desbloqueando processo {pid}.\n",
+    EventKind.PROMOTE: "(time={time}) Promovendo processo {pid} para prioridade {0}.\n",
+    EventKind.PREEMPT: "(time={time}) Retirando processo {pid}...\n",
+    EventKind.COMPLETE: "(time={time}) Processo {pid} completou.\n",
+    EventKind.DISPATCH: (
+        "dispatcher => \n"
+        "    PID: {pid}\n"
+        "    offset: {0}\n"
+        "    blocks: {1}\n"
+        "    priority: {2}\n"
+        "    time: {time}\n"
+        "    printers: {3}\n"
+        "    scanners: {4}\n"
+        "    modems: {5}\n"
+        "    satas: {6}\n"
+    ),
+    EventKind.INSTRUCTION: "Instrução {0}: ",
+    EventKind.CREATE_FILE: "Processo {pid} criou arquivo '{0}' no endereço {1}.\n",
+    EventKind.CREATE_FILE_ERROR: "Não pode criar arquivo {0}: {1}\n",
+    EventKind.DELETE_FILE: "Processo {pid} deletou o arquivo '{0}'.\n",
+    EventKind.DELETE_FILE_ERROR: "Não pode deletar arquivo {0}: {1}\n",
+    EventKind.COMPACT: "(time={time}) Compactando a memória ao liberar o processo {pid}: {0} blocos movidos.\n",
+}
+
+
+def render(event: Event) -> str:
+    return TEMPLATES[event.kind].format(*event.data, time=event.time, pid=event.pid)
+
+
+class TextLog(EventLog):
+    """Escreve os eventos no formato de texto do simulador (por padrão
+    na saída padrão)"""
+
+    def __init__(self, stream: Optional[TextIO] = None, buffer_size: int = BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.stream = stream
+
+    def write(self, events: list[Event]):
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write("".join(map(render, events)))
+
+
+class JsonLog(EventLog):
+    """Escreve um evento JSON por linha, para análise posterior"""
+
+    def __init__(self, stream: TextIO, buffer_size: int = BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.stream = stream
+
+    def write(self, events: list[Event]):
+        # Importado aqui: só o registro JSON precisa dele
+        import json
+
+        lines = [
+            json.dumps(
+                {
+                    "kind": event.kind.name.lower(),
+                    "time": event.time,
+                    "pid": event.pid,
+                    "data": event.data,
+                },
+                ensure_ascii=False,
+            )
+            for event in events
+        ]
+        lines.append("")
+        self.stream.write("\n".join(lines))
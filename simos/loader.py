@@ -0,0 +1,245 @@
+from array import array
+from collections.abc import Sequence
+from typing import Iterator
+
+from simos.managers.process import (
+    PCB,
+    CreateFileInstruction,
+    DeleteFileInstruction,
+    Instruction,
+)
+from simos.managers.resource import Printer, Scanner, Sata, Modem, Resource
+
+
+# Quantidade de linhas convertidas de uma vez para as colunas
+BATCH_SIZE = 4096
+
+
+def read_records(lines: Iterator[str]) -> Iterator[list[str]]:
+    """Gera os campos de cada linha não vazia, separados por vírgula"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        yield [p.strip() for p in line.split(",")]
+
+
+def batches(records: Iterator[list[str]], size: int = BATCH_SIZE):
+    batch: list[list[str]] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if len(batch) > 0:
+        yield batch
+
+
+class ProcessTrace:
+    """Processos do arquivo de entrada guardados em colunas.
+
+    Cada processo ocupa algumas posições em arrays tipados. O PCB só é
+    criado (com `pcb`) quando o processo está para ser admitido.
+    """
+
+    def __init__(self):
+        self.init_duration = array("i")
+        self.priority = array("i")
+        self.cpu_duration = array("i")
+        self.allocated_blocks = array("i")
+
+        # Códigos de impressora e SATA (só para quem usa), e indicadores
+        # de uso de scanner e modem
+        self.printers: dict[int, str] = {}
+        self.satas: dict[int, str] = {}
+        self.scanners = bytearray()
+        self.modems = bytearray()
+
+        # Recursos existentes no sistema
+        self.resources: set[Resource] = set()
+
+    def __len__(self):
+        return len(self.priority)
+
+    def extend(self, batch: list[list[str]]):
+        pid = len(self)
+        for parts in batch:
+            init, prio, cpu, blocks, prn, scn, modem, disk = parts
+
+            # Não ficou claro na especificação
+
+            # Assumimos que 0 é um código "morto" e implica a não
+            # utilização da impressora ou do Sata, isso é inferido
+            # pelos exemplos aprensentados
+
+            # Caso contrário, o código será aquilo que estiver nessa
+            # coluna
+            if prn != "0":
+                self.printers[pid] = prn
+            if disk != "0":
+                self.satas[pid] = disk
+            self.scanners.append(scn == "1")
+            self.modems.append(modem == "1")
+
+            resources = self.use_resources(pid)
+            if len(resources) > 0:
+                self.resources.add(resources[0])
+
+            if len(resources) > 1:
+                raise ValueError("Cada processo deve utilizar um recurso somente.")
+
+            pid += 1
+
+        self.init_duration.extend(int(parts[0]) for parts in batch)
+        self.priority.extend(int(parts[1]) for parts in batch)
+        self.cpu_duration.extend(int(parts[2]) for parts in batch)
+        self.allocated_blocks.extend(int(parts[3]) for parts in batch)
+
+    def use_resources(self, pid: int) -> list[Resource]:
+        resources: list[Resource] = []
+        if pid in self.printers:
+            resources.append(Printer(self.printers[pid]))
+        if self.scanners[pid]:
+            resources.append(Scanner())
+        if self.modems[pid]:
+            resources.append(Modem())
+        if pid in self.satas:
+            resources.append(Sata(self.satas[pid]))
+        return resources
+
+    def pcb(self, pid: int) -> PCB:
+        return PCB(
+            pid=pid,
+            priority=self.priority[pid],
+            init_duration=self.init_duration[pid],
+            cpu_duration=self.cpu_duration[pid],
+            memory_offset=0,
+            allocated_blocks=self.allocated_blocks[pid],
+            use_resources=self.use_resources(pid),
+        )
+
+    def admit_time(self, pid: int) -> int:
+        # Todos os processos chegam no instante 0
+        return 1 + self.init_duration[pid]
+
+    def arrival_order(self) -> array:
+        """PIDs na ordem em que os processos serão admitidos"""
+        return array(
+            "i", sorted(range(len(self)), key=self.init_duration.__getitem__)
+        )
+
+
+class InstructionStream(Sequence):
+    """Instruções de um processo, guardadas como índices das linhas do
+    traço de operações. Cada instrução só é decodificada quando é lida
+    (ao ser executada) e não fica guardada depois disso."""
+
+    __slots__ = ("operations", "rows")
+
+    def __init__(self, operations: "OperationTrace", rows: array):
+        self.operations = operations
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: int) -> Instruction:
+        return self.operations.decode(self.rows[index])
+
+    def __reduce__(self):
+        # Os traços não fazem parte dos snapshots: as instruções do
+        # processo são gravadas já decodificadas
+        return (list, (list(self),))
+
+
+class OperationTrace:
+    """Estado inicial do disco e operações de arquivos, em colunas.
+
+    Os nomes de arquivos são guardados uma vez só, em `names`; cada
+    operação guarda o índice do nome."""
+
+    def __init__(
+        self,
+        total_blocks: int,
+        initial_files: list[tuple[str, int, int]],
+        n_processes: int,
+    ):
+        self.total_blocks = total_blocks
+        self.initial_files = initial_files
+        self.n_processes = n_processes
+
+        self.pid = array("i")
+        self.create = bytearray()
+        self.name = array("i")
+        self.blocks = array("i")
+
+        self.names: list[str] = []
+        self.name_ids: dict[str, int] = {}
+
+        # Índices das operações de cada processo, em ordem
+        self.by_pid: dict[int, array] = {}
+
+        # Pids inexistentes encontrados (as linhas deles são descartadas)
+        self.missing = array("i")
+
+    def extend(self, batch: list[list[str]]):
+        row = len(self.pid)
+        name_ids = self.name_ids
+        for pid_str, op_code, filename, *rest in batch:
+            pid = int(pid_str)
+            if not 0 <= pid < self.n_processes:
+                print(f"Processo {pid} não existe")
+                self.missing.append(pid)
+                continue
+
+            self.pid.append(pid)
+            self.create.append(op_code == "0")
+            name = name_ids.get(filename)
+            if name is None:
+                name = name_ids[filename] = len(self.names)
+                self.names.append(filename)
+            self.name.append(name)
+            self.blocks.append(int(rest[0]) if op_code == "0" else 0)
+
+            if pid not in self.by_pid:
+                self.by_pid[pid] = array("i")
+            self.by_pid[pid].append(row)
+            row += 1
+
+    def filename(self, row: int) -> str:
+        return self.names[self.name[row]]
+
+    def decode(self, row: int) -> Instruction:
+        if self.create[row]:
+            return CreateFileInstruction(self.filename(row), self.blocks[row])
+        return DeleteFileInstruction(self.filename(row))
+
+    def instructions(self, pid: int) -> InstructionStream:
+        return InstructionStream(self, self.by_pid.get(pid, array("i")))
+
+
+def load_processes(path: str) -> ProcessTrace:
+    trace = ProcessTrace()
+    with open(path) as f:
+        for batch in batches(read_records(f)):
+            trace.extend(batch)
+    return trace
+
+
+def load_operations(path: str, processes: ProcessTrace) -> OperationTrace:
+    with open(path) as f:
+        total_blocks = int(f.readline().strip())
+        n_segments = int(f.readline().strip())
+
+        initial_files: list[tuple[str, int, int]] = []
+        for _ in range(n_segments):
+            line = f.readline().strip()
+            filename, address, size = [p.strip() for p in line.split(",")]
+            initial_files.append((filename, int(address), int(size)))
+
+        trace = OperationTrace(total_blocks, initial_files, len(processes))
+        for batch in batches(read_records(f)):
+            trace.extend(batch)
+
+    return trace
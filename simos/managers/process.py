@@ -1,6 +1,7 @@
-from dataclasses import dataclass, field
+from array import array
 from collections import deque
-from typing import Optional
+import heapq
+from typing import TYPE_CHECKING, Optional, Sequence
 from enum import Enum, auto
 
 from simos.managers.resource import (
@@ -13,8 +14,12 @@ from simos.managers.resource import (
 )
 from simos.managers.memory import MemoryManager, OutOfMemoryError
 from simos.managers.storage import FileManager
+from simos.events import EventKind, EventLog, TextLog
 from simos.types import Instruction, ScheduleEvent, SystemError, SimulationError
 
+if TYPE_CHECKING:
+    from simos.metrics import MetricsCollector
+
 
 class PCBError(SystemError):
     pass
@@ -32,70 +37,201 @@ class State(Enum):
     TERMINATED = auto()
 
 
-@dataclass
 class CreateFileInstruction(Instruction):
-    filename: str
-    blocks: int
-
-    def execute(self, process: "PCB", storage: FileManager) -> None:
+    def __init__(self, filename: str, blocks: int):
+        self.filename = filename
+        self.blocks = blocks
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, CreateFileInstruction)
+            and other.filename == self.filename
+            and other.blocks == self.blocks
+        )
+
+    def __repr__(self):
+        return f"CreateFileInstruction(filename={self.filename!r}, blocks={self.blocks})"
+
+    def execute(
+        self, process: "PCB", storage: FileManager, log: EventLog, time: int
+    ) -> None:
         try:
             address = storage.create_file(process.pid, self.filename, self.blocks)
-            print(
-                f"Processo {process.pid} criou arquivo '{self.filename}' no endereço {address}."
-            )
+            log.record(EventKind.CREATE_FILE, time, process.pid, self.filename, address)
         except SystemError as e:
-            print(f"Não pode criar arquivo {self.filename}: {e}")
+            log.record(EventKind.CREATE_FILE_ERROR, time, process.pid, self.filename, str(e))
 
 
-@dataclass
 class DeleteFileInstruction(Instruction):
-    filename: str
+    def __init__(self, filename: str):
+        self.filename = filename
 
-    def execute(self, process: "PCB", storage: FileManager) -> None:
+    def __eq__(self, other):
+        return isinstance(other, DeleteFileInstruction) and other.filename == self.filename
+
+    def __repr__(self):
+        return f"DeleteFileInstruction(filename={self.filename!r})"
+
+    def execute(
+        self, process: "PCB", storage: FileManager, log: EventLog, time: int
+    ) -> None:
         try:
             storage.delete_file(process.pid, self.filename, process.priority == 0)
-            print(f"Processo {process.pid} deletou o arquivo '{self.filename}'.")
+            log.record(EventKind.DELETE_FILE, time, process.pid, self.filename)
         except SystemError as e:
-            print(f"Não pode deletar arquivo {self.filename}: {e}")
+            log.record(EventKind.DELETE_FILE_ERROR, time, process.pid, self.filename, str(e))
 
 
-@dataclass
 class PCB:
-    pid: int
-    priority: int
-
-    # Tempo para ficar pronto logo após ser criado (incialização)
-    init_duration: int
-    # Tempo que vai ficar na cpu para completar a tarefa
-    cpu_duration: int
+    __slots__ = (
+        "pid",
+        "priority",
+        "init_duration",
+        "cpu_duration",
+        "memory_offset",
+        "allocated_blocks",
+        "instructions",
+        "last_instruction",
+        "use_resources",
+        "state",
+        "consumed_cpu_time",
+        "arrive_queue_time",
+    )
 
-    # Endereço da memória e espaço alocado (em blocos)
-    memory_offset: int
-    allocated_blocks: int
-
-    instructions: list[Instruction] = field(default_factory=list)
-    last_instruction: int = -1
-
-    use_resources: list[Resource] = field(default_factory=list)
-    state: State = State.NEW
-
-    spent_waiting_time: int = 0
-    consumed_cpu_time: int = 0
-
-    arrive_queue_time: Optional[int] = None
+    def __init__(
+        self,
+        pid: int,
+        priority: int,
+        init_duration: int,
+        cpu_duration: int,
+        memory_offset: int,
+        allocated_blocks: int,
+        instructions: Optional[Sequence[Instruction]] = None,
+        last_instruction: int = -1,
+        use_resources: Optional[list[Resource]] = None,
+        state: State = State.NEW,
+        consumed_cpu_time: int = 0,
+        arrive_queue_time: Optional[int] = None,
+    ):
+        self.pid = pid
+        self.priority = priority
+
+        # Tempo para ficar pronto logo após ser criado (incialização)
+        self.init_duration = init_duration
+        # Tempo que vai ficar na cpu para completar a tarefa
+        self.cpu_duration = cpu_duration
+
+        # Endereço da memória e espaço alocado (em blocos)
+        self.memory_offset = memory_offset
+        self.allocated_blocks = allocated_blocks
+
+        # Uma lista ou um fluxo decodificado sob demanda (ver
+        # `simos.loader.InstructionStream`)
+        self.instructions: Sequence[Instruction] = (
+            instructions if instructions is not None else []
+        )
+        self.last_instruction = last_instruction
+
+        self.use_resources: list[Resource] = (
+            use_resources if use_resources is not None else []
+        )
+        self.state = state
+
+        self.consumed_cpu_time = consumed_cpu_time
+
+        # Instante a partir do qual o processo envelhece na fila em que está
+        self.arrive_queue_time = arrive_queue_time
+
+    def __repr__(self):
+        return f"PCB(pid={self.pid}, priority={self.priority}, state={self.state.name})"
+
+
+# Tipos das colunas em que ficam os processos terminados
+COLUMNS: dict[str, str] = {
+    "priority": "i",
+    "init_duration": "q",
+    "cpu_duration": "q",
+    "memory_offset": "q",
+    "allocated_blocks": "q",
+    "last_instruction": "q",
+    "consumed_cpu_time": "q",
+    "arrive_queue_time": "q",
+}
+
+# Marca de "sem valor" nas colunas opcionais
+NO_VALUE = -1
+
+
+class ProcessTable(dict[int, PCB]):
+    """Tabela de processos: os PCBs dos processos vivos, por PID.
+
+    Os processos terminados saem do dicionário (`retire`) e só os campos
+    numéricos deles ficam guardados, uma linha em colunas tipadas (struct
+    of arrays); ler um deles devolve uma cópia refeita da linha.
+    `compact` descarta essas linhas.
+    """
+
+    def __init__(self):
+        super().__init__()
+        for name, typecode in COLUMNS.items():
+            setattr(self, name, array(typecode))
+        # Linha de cada processo terminado
+        self.rows: dict[int, int] = {}
+
+    def add(self, process: PCB):
+        self[process.pid] = process
+
+    def retire(self, pid: int):
+        """Move um processo terminado para as colunas, descartando o PCB,
+        as instruções e os recursos dele"""
+        process = self.pop(pid)
+        self.rows[pid] = len(self.rows)
+        for name in COLUMNS:
+            value = getattr(process, name)
+            getattr(self, name).append(NO_VALUE if value is None else value)
+
+    def compact(self):
+        """Descarta os processos terminados"""
+        for name, typecode in COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self.rows = {}
+
+    def __missing__(self, pid: int) -> PCB:
+        row = self.rows[pid]
+        arrive_queue_time = self.arrive_queue_time[row]
+        return PCB(
+            pid,
+            self.priority[row],
+            self.init_duration[row],
+            self.cpu_duration[row],
+            self.memory_offset[row],
+            self.allocated_blocks[row],
+            last_instruction=self.last_instruction[row],
+            state=State.TERMINATED,
+            consumed_cpu_time=self.consumed_cpu_time[row],
+            arrive_queue_time=None if arrive_queue_time == NO_VALUE else arrive_queue_time,
+        )
 
 
 class ProcessManager:
     def __init__(
-        self, memory: MemoryManager, resource: ResourceManager, storage: FileManager
+        self,
+        memory: MemoryManager,
+        resource: ResourceManager,
+        storage: FileManager,
+        log: Optional[EventLog] = None,
     ):
         self.memory = memory
         self.resource = resource
         self.storage = storage
 
-        self.process_table: dict[int, PCB] = {}
+        # Por padrão os eventos são escritos em texto na saída padrão
+        self.log = log if log is not None else TextLog()
+
+        self.process_table = ProcessTable()
 
-        self.new_processes: set[int] = set()
+        # Processos novos ordenados pelo instante em que serão admitidos
+        self.new_processes: list[tuple[int, int]] = []
         self.blocked_processes: set[int] = set()
 
         self.realtime_queue: deque[int] = deque()
@@ -104,15 +240,99 @@ class ProcessManager:
         # Ignora-se a primeira fila já que é a mais prioritária
         self.aging_thresholds: list[int] = [3, 5]
 
-        self.terminated: list[int] = []
+        self.terminated = array("q")
+
+        # Descarta da tabela os processos terminados quando eles forem a
+        # maioria (ver `ProcessTable.compact`)
+        self.compact_terminated: bool = False
+
+        # Processo em cada CPU. Os métodos do escalonador agem sobre a CPU
+        # selecionada (ver `select_cpu`), cujo processo é `running`.
+        self.slots: list[Optional[int]] = [None]
+        self.cpu: int = 0
+        # Filas READY: uma só, compartilhada por todas as CPUs, ou uma por
+        # CPU (ver `configure_cpus`). `realtime_queue` e `user_queue` são
+        # as filas da CPU selecionada.
+        self.per_cpu_queues: bool = False
+        self.ready_queues = [(self.realtime_queue, self.user_queue)]
 
-        self.running: Optional[int] = None
         self.quantum: int = 1  # 1 ms
 
-    def add_process(self, process: PCB):
-        """Insere um novo processo na tabela e na fila de \"novos\" """
-        self.process_table[process.pid] = process
-        self.new_processes.add(process.pid)
+        # Coletor de métricas avisado de cada transição de estado (ver
+        # `simos.metrics`); desligado por padrão
+        self.metrics: Optional["MetricsCollector"] = None
+
+        # Último instante simulado e último instante em que o
+        # envelhecimento das filas foi aplicado
+        self.time: int = 0
+        self.aging_time: int = 0
+
+    @property
+    def running(self) -> Optional[int]:
+        return self.slots[self.cpu]
+
+    @running.setter
+    def running(self, pid: Optional[int]):
+        self.slots[self.cpu] = pid
+
+    @property
+    def cpus(self) -> int:
+        return len(self.slots)
+
+    def configure_cpus(self, cpus: int, per_cpu_queues: bool = False):
+        """Simula `cpus` CPUs. Com `per_cpu_queues` cada CPU tem suas
+        próprias filas READY e, quando elas esvaziam, rouba o primeiro
+        processo da fila mais prioritária da CPU com mais processos
+        esperando. Deve ser chamado antes da simulação começar."""
+        if cpus < 1:
+            raise SchedulerError(f"Quantidade de CPUs inválida: {cpus}.")
+
+        self.slots = [None] * cpus
+        self.per_cpu_queues = per_cpu_queues and cpus > 1
+        if self.per_cpu_queues:
+            self.ready_queues = [
+                (deque(), [deque(), deque(), deque()]) for _ in range(cpus)
+            ]
+        else:
+            self.ready_queues = [(deque(), [deque(), deque(), deque()])]
+        self.select_cpu(0)
+
+    def select_cpu(self, cpu: int):
+        self.cpu = cpu
+        if self.per_cpu_queues:
+            self.realtime_queue, self.user_queue = self.ready_queues[cpu]
+        else:
+            self.realtime_queue, self.user_queue = self.ready_queues[0]
+
+    def least_loaded_cpu(self) -> Optional[int]:
+        # Com filas por CPU, os processos que ficam prontos vão para a CPU
+        # com menos processos (esperando ou rodando)
+        if not self.per_cpu_queues:
+            return None
+
+        def load(cpu: int) -> int:
+            realtime_queue, user_queue = self.ready_queues[cpu]
+            waiting = len(realtime_queue) + sum(len(queue) for queue in user_queue)
+            return waiting + (self.slots[cpu] is not None)
+
+        return min(range(self.cpus), key=load)
+
+    def add_process(self, process: PCB, arrival_time: Optional[int] = None):
+        """Insere um novo processo na tabela e na fila de \"novos\".
+
+        `arrival_time` é o instante em que o processo chegou ao sistema
+        (por padrão, o instante atual)."""
+        self.process_table.add(process)
+
+        if arrival_time is None:
+            arrival_time = self.time
+        if self.metrics is not None:
+            self.metrics.arrive(process.pid, arrival_time)
+
+        # O processo fica pronto depois de `init_duration` ticks,
+        # contados a partir do tick seguinte à chegada
+        admit_time = arrival_time + 1 + process.init_duration
+        heapq.heappush(self.new_processes, (admit_time, process.pid))
 
     def allocate_memory(self, process: PCB):
         offset = None
@@ -127,113 +347,310 @@ class ProcessManager:
 
         process.memory_offset = offset
 
-    def enqueue_process(self, process: PCB, time: int):
-        # Coloca um processo na fila de "ready"
+    def enqueue_process(self, process: PCB, time: int, cpu: Optional[int] = None):
+        # Coloca um processo na fila de "ready" da CPU selecionada (ou da
+        # CPU `cpu`, com filas por CPU)
+        realtime_queue, user_queue = self.realtime_queue, self.user_queue
+        if cpu is not None and self.per_cpu_queues:
+            realtime_queue, user_queue = self.ready_queues[cpu]
+
+        # Se o envelhecimento deste tick ainda não foi aplicado (processo
+        # admitido agora), o tick atual já conta como tempo de espera
+        arrive_time = time - 1 if self.aging_time < time else time
+
         if process.priority == 0:
-            process.arrive_queue_time = time
-            self.realtime_queue.append(process.pid)
+            process.arrive_queue_time = arrive_time
+            realtime_queue.append(process.pid)
         elif process.priority <= 3:
-            process.arrive_queue_time = time
-            self.user_queue[process.priority - 1].append(process.pid)
+            process.arrive_queue_time = arrive_time
+            user_queue[process.priority - 1].append(process.pid)
         else:
             raise SchedulerError(f"A prioridade {process.priority} não existe.")
 
     def next_process(self):
         self.running = None
 
-        if len(self.realtime_queue) > 0:
-            pid = self.realtime_queue.popleft()
-            self.running = pid
-        else:
-            for queue in self.user_queue:
-                if len(queue) > 0:
-                    pid = queue.popleft()
-                    self.running = pid
-                    break
+        pid = self.pop_ready(self.realtime_queue, self.user_queue)
+        if pid is None and self.per_cpu_queues:
+            # Work stealing: a CPU sem processos prontos pega um da CPU
+            # com mais processos esperando
+            victim = max(
+                self.ready_queues,
+                key=lambda queues: len(queues[0]) + sum(len(queue) for queue in queues[1]),
+            )
+            pid = self.pop_ready(*victim)
 
-        if self.running is not None:
+        if pid is not None:
+            self.running = pid
             process = self.process_table[pid]
-            process.spent_waiting_time = 0
             process.state = State.RUNNING
 
         return self.running
 
-    def admit_process(self, process: PCB, time: int):
-        self.new_processes.remove(process.pid)
-        process.spent_waiting_time = 0
+    def pop_ready(self, realtime_queue: deque, user_queue: list[deque]) -> Optional[int]:
+        # Primeiro processo da fila mais prioritária
+        if len(realtime_queue) > 0:
+            return realtime_queue.popleft()
+        for queue in user_queue:
+            if len(queue) > 0:
+                return queue.popleft()
+        return None
+
+    def waiting_priority(self) -> int:
+        # Prioridade do primeiro processo que o dispatcher escolheria nas
+        # filas da CPU selecionada (4 se estiverem vazias)
+        if len(self.realtime_queue) > 0:
+            return 0
+        for level, queue in enumerate(self.user_queue):
+            if len(queue) > 0:
+                return level + 1
+        return len(self.user_queue) + 1
 
+    def admit_process(self, process: PCB, time: int):
         try:
             self.allocate_memory(process)
         except OutOfMemoryError:
-            print(
-                f"(time={time}) Bloqueando processo {process.pid}, sem memória disponível."
-            )
+            self.log.record(EventKind.BLOCK_MEMORY, time, process.pid)
             process.state = State.BLOCKED
             self.blocked_processes.add(process.pid)
+            if self.metrics is not None:
+                self.metrics.transition(process.pid, State.BLOCKED, time)
             return
 
-        if len(process.use_resources) > 0:
-            if not self.resource.acquire(process.pid, process.use_resources[0]):
-                print(
-                    f"(time={time}) Bloqueando processo {process.pid}, sem recursos disponíveis."
-                )
-                process.state = State.BLOCKED
-                self.blocked_processes.add(process.pid)
-                return
+        if not self.acquire_resources(process):
+            self.log.record(EventKind.BLOCK_RESOURCE, time, process.pid)
+            process.state = State.BLOCKED
+            self.blocked_processes.add(process.pid)
+            if self.metrics is not None:
+                self.metrics.transition(process.pid, State.BLOCKED, time)
+            return
 
-        print(f"(time={time}) Processo {process.pid} pronto.")
+        self.log.record(EventKind.ADMIT, time, process.pid)
 
-        self.enqueue_process(process, time)
+        self.enqueue_process(process, time, self.least_loaded_cpu())
         process.state = State.READY
+        if self.metrics is not None:
+            self.metrics.transition(process.pid, State.READY, time)
+
+    def acquire_resources(self, process: PCB) -> bool:
+        # Se o recurso estiver ocupado, o processo entra na fila de
+        # espera dele e é acordado quando o recurso for liberado
+        if len(process.use_resources) == 0:
+            return True
+        return self.resource.acquire(process.pid, process.use_resources[0])
+
+    def release_process(self, process: PCB, time: int):
+        """Devolve a memória e o recurso de um processo que terminou e
+        desbloqueia, de uma vez, os processos que podem continuar"""
+
+        unblocked, relocated = self.memory.free(
+            process.memory_offset, process.allocated_blocks
+        )
+        if len(relocated) > 0:
+            moved = sum(self.process_table[pid].allocated_blocks for pid, _ in relocated)
+            self.log.record(EventKind.COMPACT, time, process.pid, moved)
+
+        # Processos que esperavam memória na região liberada. Se ainda
+        # precisarem de um recurso ocupado, passam a esperar por ele.
+        for pid, offset in unblocked:
+            unblocked_process = self.process_table[pid]
+            unblocked_process.memory_offset = offset
+            if self.acquire_resources(unblocked_process):
+                self.unblock_process(unblocked_process, time)
+            else:
+                self.log.record(EventKind.BLOCK_RESOURCE, time, pid)
+                # Continua bloqueado, agora pelo recurso: é outro bloqueio
+                if self.metrics is not None:
+                    self.metrics.transition(pid, State.BLOCKED, time)
+
+        # Processos movidos pela compactação da memória (entre eles, talvez
+        # algum que acabou de receber memória acima)
+        for pid, offset in relocated:
+            self.process_table[pid].memory_offset = offset
+
+        # O recurso vai direto para o próximo processo da fila dele
+        if len(process.use_resources) > 0:
+            pid = self.resource.release(process.use_resources[0])
+            if pid is not None:
+                self.unblock_process(self.process_table[pid], time)
 
     def unblock_process(self, process: PCB, time: int):
-        print(f"(time={time}) Desbloqueando processo {process.pid}.")
+        self.log.record(EventKind.UNBLOCK, time, process.pid)
 
         self.blocked_processes.remove(process.pid)
-        self.enqueue_process(process, time)
+        self.enqueue_process(process, time, self.least_loaded_cpu())
         process.state = State.READY
+        if self.metrics is not None:
+            self.metrics.transition(process.pid, State.READY, time)
+
+    def any_ready(self) -> bool:
+        return any(
+            len(realtime_queue) > 0 or any(len(queue) > 0 for queue in user_queue)
+            for realtime_queue, user_queue in self.ready_queues
+        )
+
+    def has_work(self) -> bool:
+        """Se ainda pode acontecer algo no sistema, isto é, se
+        `next_event` não devolveria None"""
+        return (
+            len(self.new_processes) > 0
+            or any(pid is not None for pid in self.slots)
+            or self.any_ready()
+        )
+
+    def next_event(self, time: int) -> Optional[int]:
+        """Próximo instante depois de `time` em que algo acontece no
+        sistema, ou None se nada mais vai acontecer"""
+        # Nada acontece antes do próximo tick, então assim que uma
+        # condição o garante não é preciso ver o resto do estado
+        following = time + 1
+        candidates: list[int] = []
+
+        for cpu, pid in enumerate(self.slots):
+            if pid is None:
+                # O dispatcher escalona no próximo tick (com filas por
+                # CPU, a CPU ociosa rouba de outra)
+                if self.any_ready():
+                    return following
+                continue
+
+            process = self.process_table[pid]
+
+            # Ainda há instruções para executar
+            if process.last_instruction + 1 < len(process.instructions):
+                return following
+
+            # Preempção por prioridade ou por fim do quantum
+            priority = process.priority
+            if priority > 0:
+                realtime_queue, user_queue = self.ready_queues[
+                    cpu if self.per_cpu_queues else 0
+                ]
+                if len(realtime_queue) > 0 or any(
+                    len(queue) > 0 for queue in user_queue[: priority - 1]
+                ):
+                    return following
+                if len(user_queue[priority - 1]) > 0:
+                    quantum_end = (time // self.quantum + 1) * self.quantum
+                    if quantum_end == following:
+                        return following
+                    candidates.append(quantum_end)
+
+            # Fim da rajada de CPU
+            remaining = process.cpu_duration - process.consumed_cpu_time
+            if remaining <= 1:
+                return following
+            candidates.append(time + remaining)
+
+        # Admissão de processos novos
+        if len(self.new_processes) > 0:
+            admit_time = self.new_processes[0][0]
+            if admit_time == following:
+                return following
+            candidates.append(admit_time)
+
+        # Envelhecimento nas filas de usuário
+        for _, user_queue in self.ready_queues:
+            for level in range(1, len(user_queue)):
+                queue = user_queue[level]
+                if len(queue) > 0:
+                    threshold = self.aging_thresholds[level - 1] * self.quantum
+                    aging_time = self.process_table[queue[0]].arrive_queue_time + threshold
+                    if aging_time <= following:
+                        return following
+                    candidates.append(aging_time)
+
+        if len(candidates) == 0:
+            return None
+
+        return min(candidates)
+
+    def skip_idle(self, time: int):
+        # Aplica de uma vez os ticks entre a última execução e `time`,
+        # nos quais nenhum evento acontece (ver `next_event`)
+        idle = time - self.time - 1
+        if idle <= 0:
+            return
+
+        for pid in self.slots:
+            if pid is not None:
+                self.process_table[pid].consumed_cpu_time += idle
 
     def run(self, time: int):
-        # Adiciona o tempo gasto pelos processos nas suas filas
+        self.skip_idle(time)
+        self.time = time
+
+        table = self.process_table
+        if self.compact_terminated and len(table.rows) > len(table):
+            table.compact()
+
+        self.admit_new_processes(time)
+        self.age_queues(time)
+
+        if len(self.slots) == 1:
+            # Uma CPU só (o padrão): as filas selecionadas já são as dela,
+            # então não há CPU a escolher nem preempção a distribuir
+            event = self.run_process(time)
+            if event is None:
+                self.check_preemption_single(time)
+            elif isinstance(event, ScheduleEvent):
+                self.run_dispatcher(time)
+            else:
+                raise ValueError("Evento de sistema não existe.")
+            return
+
+        # Cada CPU roda o seu processo e verifica se ele disparou algum
+        # evento; as que ainda têm processo podem sofrer preempção
+        running: list[int] = []
+        for cpu in range(len(self.slots)):
+            self.select_cpu(cpu)
+            event = self.run_process(time)
+            if event is None:
+                running.append(cpu)
+            elif isinstance(event, ScheduleEvent):
+                self.run_dispatcher(time)
+            else:
+                raise ValueError("Evento de sistema não existe.")
+
+        self.check_preemption(time, running)
+        self.select_cpu(0)
+
+    def admit_new_processes(self, time: int):
+        # Admite os processos cujo tempo de inicialização terminou
         # Isso simula a interrupção de hardware que acontece
         # quando chega um novo processo.
-        for pid in list(self.new_processes):
-            process = self.process_table[pid]
-            if process.spent_waiting_time >= process.init_duration:
-                self.admit_process(process, time)
-            else:
-                process.spent_waiting_time += 1
+        while len(self.new_processes) > 0 and self.new_processes[0][0] <= time:
+            _, pid = heapq.heappop(self.new_processes)
+            self.admit_process(self.process_table[pid], time)
+
+    def age_queues(self, time: int):
+        # Promove os processos que esperaram demais nas filas READY de
+        # usuário (AGING). Ignora-se a fila mais prioritária.
+        # Cada fila está ordenada pelo instante de chegada, então quem
+        # deve ser promovido está sempre no início dela.
+        self.aging_time = time
+        if not self.per_cpu_queues:
+            self.age_user_queue(self.ready_queues[0][1], time, None)
+            return
+        for cpu, (_, user_queue) in enumerate(self.ready_queues):
+            self.age_user_queue(user_queue, time, cpu)
 
-        # Incrementar tempo gasto de espera para processos nas filas
-        # READY de usuário (AGING)
-        # Ignora-se a fila mais prioritária
-        for level in range(1, len(self.user_queue)):
-            queue = self.user_queue[level]
+    def age_user_queue(self, user_queue: list[deque], time: int, cpu: Optional[int]):
+        for level in range(1, len(user_queue)):
+            queue = user_queue[level]
             threshold = self.aging_thresholds[level - 1] * self.quantum
-            to_promote: list[int] = []
 
-            for pid in queue:
-                process = self.process_table[pid]
-                process.spent_waiting_time += 1
-                if process.spent_waiting_time >= threshold:
-                    to_promote.append(pid)
+            while len(queue) > 0:
+                process = self.process_table[queue[0]]
+                if time - process.arrive_queue_time < threshold:
+                    break
 
-            for pid in to_promote:
-                print(f"(time={time}) Promovendo processo {pid} para prioridade {level}.")
+                queue.popleft()
+                self.log.record(EventKind.PROMOTE, time, process.pid, level)
+                if self.metrics is not None:
+                    self.metrics.promote(process.pid)
                 process.priority -= 1
-                queue.remove(pid)
-                self.user_queue[level - 1].append(pid)
-                self.process_table[pid].spent_waiting_time = 0
-
-        # Roda o processo e verifica se ele disparou algum evento
-        event = self.run_process(time)
-        if event is None:
-            return
-
-        elif isinstance(event, ScheduleEvent):
-            self.run_dispatcher(time)
-        else:
-            raise ValueError("Evento de sistema não existe.")
+                self.enqueue_process(process, time, cpu)
 
     def run_process(self, time: int):
         if self.running is None:
@@ -244,9 +661,11 @@ class ProcessManager:
 
         if 0 <= process.last_instruction + 1 < len(process.instructions):
             process.last_instruction += 1
-            print(f"Instrução {process.last_instruction+1}: ", end="")
+            self.log.record(
+                EventKind.INSTRUCTION, time, pid, process.last_instruction + 1
+            )
             process.instructions[process.last_instruction].execute(
-                process, self.storage
+                process, self.storage, self.log, time
             )
 
         # A cada tick consome um de tempo (para efeitos de simulação)
@@ -255,33 +674,73 @@ class ProcessManager:
         if process.consumed_cpu_time >= process.cpu_duration:
             # Sinalizamos para o escalonador que esse processo
             # terminou
-            print(f"(time={time}) Processo {pid} completou.")
+            self.log.record(EventKind.COMPLETE, time, pid)
             process.state = State.TERMINATED
             return ScheduleEvent()
 
-        elif process.priority > 0:
-            # Verifica preempção
-
-            # Se chegou um processo de prioridade maior, deve escalonar
-            # Simula interrupção de sistema
-            greater_priority_arrived = len(self.realtime_queue) > 0
-            for queue in self.user_queue[: process.priority - 1]:
-                if greater_priority_arrived:
+    def check_preemption(self, time: int, cpus: list[int]):
+        """Verifica preempção nas CPUs cujo processo rodou neste tick"""
+        candidates = [
+            cpu for cpu in cpus if self.process_table[self.slots[cpu]].priority > 0
+        ]
+
+        # Se chegou um processo de prioridade maior, deve escalonar
+        # Simula interrupção de sistema
+        remaining: list[int] = []
+        if self.per_cpu_queues:
+            # Cada CPU olha as próprias filas
+            for cpu in candidates:
+                self.select_cpu(cpu)
+                if self.waiting_priority() < self.process_table[self.running].priority:
+                    self.preempt(time)
+                else:
+                    remaining.append(cpu)
+        else:
+            # Filas compartilhadas: quem sai é o processo de menor
+            # prioridade entre todas as CPUs, até não haver ninguém mais
+            # prioritário esperando
+            remaining = candidates
+            while len(remaining) > 0:
+                victim = max(
+                    remaining, key=lambda cpu: self.process_table[self.slots[cpu]].priority
+                )
+                self.select_cpu(victim)
+                if self.waiting_priority() >= self.process_table[self.running].priority:
                     break
+                remaining.remove(victim)
+                self.preempt(time)
+
+        # Fim do quantum: só se existe algum processo na mesma fila de
+        # espera desse processo. Se não existir, não tem porque chamar o
+        # dispatcher
+        if time % self.quantum == 0:
+            for cpu in remaining:
+                self.select_cpu(cpu)
+                process = self.process_table[self.running]
+                if len(self.user_queue[process.priority - 1]) > 0:
+                    self.preempt(time)
+
+    def check_preemption_single(self, time: int):
+        """`check_preemption` com uma CPU só, cujo processo rodou neste
+        tick"""
+        priority = self.process_table[self.slots[0]].priority
+        if priority == 0:
+            return
 
-                if len(queue) > 0:
-                    greater_priority_arrived = True
-
-            # Se existe algum processo na mesma fila de espera desse
-            # processo. Se não existir, não tem porque chamar o dispatcher
-            any_process_in_queue = len(self.user_queue[process.priority - 1]) > 0
+        # Chegou um processo de prioridade maior ou acabou o quantum e há
+        # alguém na mesma fila
+        if self.waiting_priority() < priority or (
+            time % self.quantum == 0 and len(self.user_queue[priority - 1]) > 0
+        ):
+            self.preempt(time)
 
-            if greater_priority_arrived or (time % self.quantum == 0 and any_process_in_queue):
-                # Sinalizamos para o dispatcher que esse processo
-                # não foi terminado mas deve ser recolocado na fila
-                print(f"(time={time}) Retirando processo {pid}...")
-                process.state = State.READY
-                return ScheduleEvent()
+    def preempt(self, time: int):
+        # Sinalizamos para o dispatcher que o processo da CPU selecionada
+        # não foi terminado mas deve ser recolocado na fila
+        pid = self.running
+        self.log.record(EventKind.PREEMPT, time, pid)
+        self.process_table[pid].state = State.READY
+        self.run_dispatcher(time)
 
     def run_dispatcher(self, time: int):
         pid = None
@@ -289,24 +748,13 @@ class ProcessManager:
             pid = self.next_process()
         else:
             process = self.process_table[self.running]
+            if self.metrics is not None:
+                self.metrics.transition(process.pid, process.state, time)
+
             if process.state == State.TERMINATED:
                 self.terminated.append(self.running)
-
-                unblocked_pids = self.memory.free(process.memory_offset, process.allocated_blocks)
-                for unblocked_pid in unblocked_pids:
-                    unblocked_process = self.process_table[unblocked_pid]
-                    if len(process.use_resources) > 0:
-                        if not self.resource.acquire(process.pid, process.use_resources[0]):
-                            break
-
-                    self.unblock_process(unblocked_process, time)
-
-                if len(process.use_resources) > 0:
-                    unblocked_pid = self.resource.release(process.use_resources[0])
-                    if unblocked_pid is not None:
-                        unblocked_process = self.process_table[unblocked_pid]
-                        self.unblock_process(unblocked_process, time)
-
+                self.release_process(process, time)
+                self.process_table.retire(process.pid)
                 pid = self.next_process()
             elif process.state == State.READY:
                 self.enqueue_process(process, time)
@@ -321,22 +769,27 @@ class ProcessManager:
             # print(f"(time={time}) Nenhum processo para escalonar.")
         else:
             process = self.process_table[pid]
+            if self.metrics is not None:
+                self.metrics.transition(pid, State.RUNNING, time)
 
             printers = process.use_resources.count(lambda r: isinstance(r, Printer))
             scanners = process.use_resources.count(lambda r: isinstance(r, Scanner))
             modems = process.use_resources.count(lambda r: isinstance(r, Modem))
             satas = process.use_resources.count(lambda r: isinstance(r, Sata))
 
-            print("dispatcher => ")
-            print(f"    PID: {process.pid}")
-            print(f"    offset: {process.memory_offset}")
-            print(f"    blocks: {process.allocated_blocks}")
-            print(f"    priority: {process.priority}")
-            print(f"    time: {time}")
-            print(f"    printers: {printers}")
-            print(f"    scanners: {scanners}")
-            print(f"    modems: {modems}")
-            print(f"    satas: {satas}")
+            self.log.record(
+                EventKind.DISPATCH,
+                time,
+                process.pid,
+                process.memory_offset,
+                process.allocated_blocks,
+                process.priority,
+                printers,
+                scanners,
+                modems,
+                satas,
+                self.cpu,
+            )
 
             # self.process_table[pid].state = State.RUNNING
             # print(f"(time={time}) Escalonando processo {pid}...")
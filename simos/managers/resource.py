@@ -50,7 +50,11 @@ class ResourceManager:
     def __init__(self, available_resources: set[Resource]):
         self.available_resources = available_resources
 
-        # Uma fila de espera para cada recurso
+        # Uma fila de espera para cada recurso. Junto com as filas de
+        # memória por região (`MemoryManager.waiting_queues`), são o
+        # índice dos bloqueados pelo que cada um espera: um processo sem
+        # memória só pede o recurso depois de recebê-la, então está em uma
+        # única fila de cada vez
         self.wait_queues: dict[Resource, deque[int]] = {
             r: deque() for r in available_resources
         }
@@ -1,4 +1,7 @@
-from dataclasses import dataclass
+from typing import NamedTuple, Optional
+
+from simos.managers.extents import FreeExtents
+from simos.managers.placement import FirstFit, Fragmentation, make_policy
 from simos.types import SystemError
 
 
@@ -15,32 +18,84 @@ class FileNotExistError(SystemError):
     pass
 
 
-@dataclass
 class Metadata:
-    name: str
-    owner: int
-    address: int
-    size: int
+    def __init__(self, name: str, owner: int, address: int, size: int):
+        self.name = name
+        self.owner = owner
+        self.address = address
+        self.size = size
+
+    def __eq__(self, other):
+        return isinstance(other, Metadata) and (
+            other.name,
+            other.owner,
+            other.address,
+            other.size,
+        ) == (self.name, self.owner, self.address, self.size)
+
+    def __repr__(self):
+        return (
+            f"Metadata(name={self.name!r}, owner={self.owner}, "
+            f"address={self.address}, size={self.size})"
+        )
+
+
+class DiskUsage(NamedTuple):
+    """Ocupação do disco em um instante"""
+
+    used: int
+    files: int
+    free_extents: int
+    largest_free: int
+
+
+# Trecho [start, end) do disco que passou a ser do arquivo `name` (ou
+# ficou livre, com None)
+Change = tuple[int, int, Optional[str]]
 
 
 class FileManager:
-    def __init__(self, disk_size: int, initial_files: list[tuple[str, int, int]]):
-        # Inicializa os blocos do disco
-        self.blocks: list[str] = [None for _ in range(disk_size)]
+    def __init__(
+        self,
+        disk_size: int,
+        initial_files: list[tuple[str, int, int]],
+        policy: str = "first-fit",
+    ):
+        # O disco é representado pelos trechos ocupados (indexados pelo
+        # endereço) e pela política de posicionamento, que indexa os
+        # trechos livres. A lista de blocos só é montada quando alguém
+        # pede por ela (ver `blocks`).
+        self.disk_size = disk_size
+        self.placement = make_policy(policy, disk_size)
+        self.extents: dict[int, Metadata] = {}
         self.metadata: dict[str, Metadata] = {}
 
+        # Trechos livres entre os arquivos, para os contadores de `usage`
+        # atualizados a cada criação e deleção. As políticas baseadas em
+        # first-fit já guardam exatamente isso; o buddy reserva blocos a
+        # mais e precisa de um índice à parte.
+        self.occupancy: FreeExtents
+        self.own_occupancy = not isinstance(self.placement, FirstFit)
+        if self.own_occupancy:
+            self.occupancy = FreeExtents(disk_size)
+        else:
+            self.occupancy = self.placement.extents
+
+        # Trechos alterados desde a última leitura, se pedidos (ver
+        # `track_changes`)
+        self.changes: Optional[list[Change]] = None
+
         # Pela especificação não está claro o processo dono
         # dos arquivos iniciais. Assumiremos que somente
         # processos em tempo real possam deletá-los.
 
         # Arquivos iniciais são atribuídos ao "dono" -1 (tempo real)
-        for filename, address, size in initial_files:
-            file = Metadata(name=filename, owner=-1, address=address, size=size)
-            self.metadata[filename] = file
-
-            # Marca os blocos como ocupados pelo arquivo
-            for i in range(address, address + size):
-                self.blocks[i] = filename
+        self.load_files(
+            [
+                Metadata(name=filename, owner=-1, address=address, size=size)
+                for filename, address, size in initial_files
+            ]
+        )
 
     def create_file(self, pid: str, filename: str, size: int):
         # Busca espaço contíguo disponível
@@ -51,12 +106,34 @@ class FileManager:
         # Cria metadados e marca os blocos
         file = Metadata(name=filename, owner=pid, address=address, size=size)
         self.metadata[filename] = file
-
-        for i in range(address, address + size):
-            self.blocks[i] = filename
+        self.place(file)
 
         return address
 
+    def load_files(self, files: list[Metadata]):
+        """Coloca de uma vez arquivos com endereço já definido (ex.: os
+        arquivos iniciais). Trechos ocupados vizinhos são reservados
+        juntos, em uma passada pela política de posicionamento."""
+        for file in files:
+            self.metadata[file.name] = file
+            self.extents[file.address] = file
+
+        ranges = sorted((file.address, file.address + file.size) for file in files)
+        merged: list[tuple[int, int]] = []
+        for start, end in ranges:
+            if len(merged) > 0 and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+
+        self.placement.reserve_all(merged)
+        if self.own_occupancy:
+            self.occupancy.fill_used(merged)
+        if self.changes is not None:
+            self.changes.extend(
+                (file.address, file.address + file.size, file.name) for file in files
+            )
+
     def delete_file(self, pid: int, name: str, is_real_time: bool = False):
         file = self.metadata.get(name)
         if file is None:
@@ -69,20 +146,85 @@ class FileManager:
             )
 
         # Libera os blocos e remove metadados
-        for i in range(file.address, file.address + file.size):
-            self.blocks[i] = None
-
+        self.remove(file)
         del self.metadata[name]
 
-    def first_fit(self, size: int):
-        # Busca o primeiro espaço contíguo livre com tamanho suficiente
-        count = 0
-        for i in range(len(self.blocks)):
-            if self.blocks[i] is None:
-                count += 1
-                if count == size:
-                    return i - size + 1
-            else:
-                count = 0
+    def place(self, file: Metadata):
+        # Marca os blocos como ocupados pelo arquivo
+        self.extents[file.address] = file
+        self.placement.reserve(file.address, file.size)
+        if self.own_occupancy:
+            self.occupancy.fill(file.address, file.address + file.size, True)
+        if self.changes is not None:
+            self.changes.append((file.address, file.address + file.size, file.name))
+
+    def remove(self, file: Metadata):
+        del self.extents[file.address]
+        self.placement.release(file.address, file.size)
+        if self.own_occupancy:
+            self.occupancy.fill(file.address, file.address + file.size, False)
+        if self.changes is not None:
+            self.changes.append((file.address, file.address + file.size, None))
 
-        return None
+    def first_fit(self, size: int):
+        # Busca um espaço contíguo livre com tamanho suficiente (o
+        # primeiro, com a política padrão)
+        return self.placement.find(size, 0, self.disk_size)
+
+    def fragmentation(self) -> Fragmentation:
+        return self.placement.fragmentation(0, self.disk_size)
+
+    def usage(self) -> DiskUsage:
+        """Blocos ocupados, arquivos, trechos livres e maior trecho livre.
+        Custa O(1): os contadores ficam no índice dos trechos livres."""
+        return DiskUsage(
+            self.disk_size - self.occupancy.free_blocks(),
+            len(self.extents),
+            self.occupancy.free_runs(),
+            self.occupancy.largest(),
+        )
+
+    def track_changes(self):
+        """Passa a registrar os trechos alterados (ver `drain_changes`),
+        começando pelos arquivos já existentes"""
+        self.changes = [
+            (address, address + length, name)
+            for name, address, length in self.run_lengths()
+            if name is not None
+        ]
+
+    def drain_changes(self) -> list[Change]:
+        changes, self.changes = self.changes, []
+        return changes
+
+    def run_lengths(self) -> list[tuple[Optional[str], int, int]]:
+        """Mapa do disco em trechos (arquivo ou None, início, tamanho), em
+        ordem. Custa O(arquivos), não O(tamanho do disco)."""
+        runs: list[tuple[Optional[str], int, int]] = []
+        cursor = 0
+        for address in sorted(self.extents):
+            file = self.extents[address]
+            start = max(address, cursor)
+            end = min(address + file.size, self.disk_size)
+            if start >= end:
+                continue
+            if start > cursor:
+                runs.append((None, cursor, start - cursor))
+            runs.append((file.name, start, end - start))
+            cursor = end
+        if cursor < self.disk_size:
+            runs.append((None, cursor, self.disk_size - cursor))
+        return runs
+
+    @property
+    def blocks(self) -> list[str]:
+        """Mapa do disco (nome do arquivo em cada bloco), montado a partir
+        dos trechos ocupados"""
+        blocks: list[str] = [None] * self.disk_size
+        for file in self.extents.values():
+            blocks[file.address : file.address + file.size] = [file.name] * file.size
+        return blocks
+
+    def close(self):
+        # Nada a liberar: o disco só existe em memória
+        pass
@@ -0,0 +1,227 @@
+import bisect
+import csv
+import json
+from array import array
+from typing import Optional
+
+from simos.managers.process import State
+
+
+# Limites superiores dos baldes dos histogramas (o último balde guarda o
+# que passar do maior limite)
+BUCKETS = tuple(2**i for i in range(21))
+
+# Estados acompanhados, na ordem das colunas exportadas
+STATES = (State.NEW, State.READY, State.RUNNING, State.BLOCKED)
+
+
+class Histogram:
+    """Contagem de valores em baldes fixos"""
+
+    def __init__(self, bounds: tuple[int, ...] = BUCKETS):
+        self.bounds = bounds
+        self.counts = array("q", bytes(8 * (len(bounds) + 1)))
+        self.total = 0
+        self.samples = 0
+
+    def add(self, value: int):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.samples += 1
+
+    def mean(self) -> float:
+        return self.total / self.samples if self.samples else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "bounds": list(self.bounds),
+            "counts": list(self.counts),
+            "mean": self.mean(),
+            "samples": self.samples,
+        }
+
+
+class MetricsCollector:
+    """Métricas da execução, alimentadas pelas transições de estado do
+    `ProcessManager` (ver `ProcessManager.metrics`).
+
+    Por processo: turnaround, tempo de resposta, tempo em cada estado,
+    bloqueios, preempções e promoções, em colunas indexadas pelo pid. Por execução:
+    utilização da CPU, da memória e do disco, e histogramas dos tempos.
+    """
+
+    def __init__(self, cpus: int = 1):
+        self.cpus = cpus
+
+        self.state = bytearray()
+        self.since = array("q")
+        self.arrival = array("q")
+        self.first_run = array("q")
+        self.completion = array("q")
+        self.blocks = array("i")
+        self.preemptions = array("i")
+        self.promotions = array("i")
+        self.time_in: dict[State, array] = {state: array("q") for state in STATES}
+
+        self.histograms = {
+            "turnaround": Histogram(),
+            "response": Histogram(),
+            "waiting": Histogram(),
+            "blocked": Histogram(),
+        }
+
+        # Utilização: blocos ocupados ponderados pelo tempo até a próxima
+        # amostra (ver `sample`)
+        self.last_sample: Optional[int] = None
+        self.memory_used = 0
+        self.disk_used = 0
+        self.memory_area = 0
+        self.disk_area = 0
+        self.memory_size = 0
+        self.disk_size = 0
+        self.makespan = 0
+
+    def grow(self, pid: int):
+        missing = pid + 1 - len(self.state)
+        if missing <= 0:
+            return
+
+        self.state.extend(bytes(missing))
+        for column in (self.since, self.arrival, self.first_run, self.completion):
+            column.extend(array("q", [-1]) * missing)
+        for column in (
+            self.blocks,
+            self.preemptions,
+            self.promotions,
+            *self.time_in.values(),
+        ):
+            column.extend(array(column.typecode, bytes(column.itemsize * missing)))
+
+    def arrive(self, pid: int, time: int):
+        self.grow(pid)
+        self.state[pid] = State.NEW.value
+        self.since[pid] = time
+        self.arrival[pid] = time
+
+    def transition(self, pid: int, state: State, time: int):
+        previous = State(self.state[pid])
+        self.time_in[previous][pid] += time - self.since[pid]
+        self.since[pid] = time
+        self.state[pid] = state.value
+
+        if state == State.RUNNING:
+            if self.first_run[pid] < 0:
+                self.first_run[pid] = time
+        elif state == State.BLOCKED:
+            self.blocks[pid] += 1
+        elif state == State.READY and previous == State.RUNNING:
+            self.preemptions[pid] += 1
+        elif state == State.TERMINATED:
+            self.complete(pid, time)
+
+    def promote(self, pid: int):
+        self.promotions[pid] += 1
+
+    def complete(self, pid: int, time: int):
+        self.completion[pid] = time
+        self.makespan = max(self.makespan, time)
+
+        arrival = self.arrival[pid]
+        self.histograms["turnaround"].add(time - arrival)
+        if self.first_run[pid] >= 0:
+            self.histograms["response"].add(self.first_run[pid] - arrival)
+        self.histograms["waiting"].add(self.time_in[State.READY][pid])
+        self.histograms["blocked"].add(self.time_in[State.BLOCKED][pid])
+
+    def sample(
+        self, time: int, memory_used: int, memory_size: int, disk_used: int, disk_size: int
+    ):
+        """Ocupação da memória e do disco depois do tick `time`; vale até
+        a próxima amostra"""
+        if self.last_sample is not None:
+            elapsed = time - self.last_sample
+            self.memory_area += self.memory_used * elapsed
+            self.disk_area += self.disk_used * elapsed
+
+        self.last_sample = time
+        self.memory_used, self.memory_size = memory_used, memory_size
+        self.disk_used, self.disk_size = disk_used, disk_size
+
+    def summary(self) -> dict:
+        completed = sum(1 for time in self.completion if time >= 0)
+        busy = sum(self.time_in[State.RUNNING])
+
+        # A última amostra vale até o fim da execução
+        memory_area, disk_area, span = self.memory_area, self.disk_area, 0
+        if self.last_sample is not None:
+            end = max(self.makespan, self.last_sample + 1)
+            memory_area += self.memory_used * (end - self.last_sample)
+            disk_area += self.disk_used * (end - self.last_sample)
+            span = end - min((t for t in self.arrival if t >= 0), default=0)
+
+        return {
+            "processes": len(self.state),
+            "completed": completed,
+            "makespan": self.makespan,
+            # Médias dos processos que terminaram; a espera é o tempo em
+            # READY, sem o tempo bloqueado
+            "turnaround": self.histograms["turnaround"].mean(),
+            "waiting": self.histograms["waiting"].mean(),
+            "blocks": sum(self.blocks),
+            "blocked_time": sum(self.time_in[State.BLOCKED]),
+            "preemptions": sum(self.preemptions),
+            "promotions": sum(self.promotions),
+            "cpu_utilisation": (
+                busy / (self.makespan * self.cpus) if self.makespan else 0.0
+            ),
+            "memory_utilisation": (
+                memory_area / (self.memory_size * span) if self.memory_size and span else 0.0
+            ),
+            "disk_utilisation": (
+                disk_area / (self.disk_size * span) if self.disk_size and span else 0.0
+            ),
+        }
+
+    def rows(self):
+        """Uma linha por processo, na ordem dos pids"""
+        for pid in range(len(self.state)):
+            arrival = self.arrival[pid]
+            if arrival < 0:
+                continue
+            completion = self.completion[pid]
+            first_run = self.first_run[pid]
+            row = {
+                "pid": pid,
+                "state": State(self.state[pid]).name.lower(),
+                "arrival": arrival,
+                "completion": completion if completion >= 0 else None,
+                "turnaround": completion - arrival if completion >= 0 else None,
+                "response": first_run - arrival if first_run >= 0 else None,
+                "blocks": self.blocks[pid],
+                "preemptions": self.preemptions[pid],
+                "promotions": self.promotions[pid],
+            }
+            for state in STATES:
+                row[state.name.lower()] = self.time_in[state][pid]
+            yield row
+
+    def to_dict(self) -> dict:
+        return {
+            "run": self.summary(),
+            "histograms": {
+                name: histogram.to_dict() for name, histogram in self.histograms.items()
+            },
+        }
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_csv(self, path: str):
+        columns = ["pid", "state", "arrival", "completion", "turnaround", "response"]
+        columns += [state.name.lower() for state in STATES]
+        columns += ["blocks", "preemptions", "promotions"]
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            writer.writerows(self.rows())
@@ -0,0 +1,170 @@
+import functools
+import marshal
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Optional, TextIO
+
+from simos.events import EventLog
+from simos.managers.memory import MemoryManager
+from simos.managers.process import ProcessManager
+from simos.managers.storage import FileManager
+from simos.simulation import Simulation
+
+
+class Counter:
+    __slots__ = ("calls", "blocks", "total", "own", "callers", "code")
+
+    def __init__(self):
+        self.calls = 0
+        self.blocks = 0
+        # Nanossegundos acumulados, com e sem as funções chamadas
+        self.total = 0
+        self.own = 0
+        # Chamador -> [chamadas, ns próprios, ns totais]
+        self.callers: dict[str, list[int]] = {}
+        self.code: Optional[tuple[str, int, str]] = None
+
+
+# Métodos medidos: (classe, método, blocos envolvidos em cada chamada).
+# Os métodos de `run` em ordem são as fases de um tick.
+HOOKS: list[tuple[type, str, Optional[Callable[..., int]]]] = [
+    (Simulation, "step", None),
+    (ProcessManager, "run", None),
+    (ProcessManager, "skip_idle", None),
+    (ProcessManager, "admit_new_processes", None),
+    (ProcessManager, "age_queues", None),
+    (ProcessManager, "run_process", None),
+    (ProcessManager, "check_preemption", None),
+    (ProcessManager, "run_dispatcher", None),
+    (ProcessManager, "release_process", None),
+    (ProcessManager, "next_event", None),
+    (MemoryManager, "find_fit", lambda self, size, start, end: size),
+    (MemoryManager, "allocate", lambda self, pid, offset, space: space),
+    (MemoryManager, "free", lambda self, offset, space: space),
+    (MemoryManager, "compact", None),
+    (FileManager, "first_fit", lambda self, size: size),
+    (FileManager, "create_file", None),
+    (FileManager, "delete_file", None),
+]
+
+
+class Profiler:
+    """Contadores de chamadas, blocos e tempo dos métodos do simulador.
+
+    Os métodos só são trocados por versões medidas dentro de `attached`,
+    então o simulador não paga nada quando o profiler não é usado. Os
+    blocos são os pedidos em cada chamada (tamanho procurado, alocado ou
+    liberado), já que as buscas não percorrem o vetor de blocos.
+    """
+
+    def __init__(self):
+        self.counters: dict[str, Counter] = defaultdict(Counter)
+        # Tempo próprio de cada pilha de chamadas ("a;b;c")
+        self.stacks: dict[str, int] = defaultdict(int)
+        # Pilha atual: [nome, ns gastos nas chamadas internas]
+        self.stack: list[list] = []
+
+    def timed(self, name: str, function: Callable, blocks: Optional[Callable[..., int]]):
+        profiler = self
+        counter = self.counters[name]
+        code = function.__code__
+        counter.code = (code.co_filename, code.co_firstlineno, name)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = profiler.stack
+            frame = [name, 0]
+            caller = stack[-1][0] if len(stack) > 0 else None
+            stack.append(frame)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                own = elapsed - frame[1]
+                path = ";".join(entry[0] for entry in stack)
+                stack.pop()
+                if len(stack) > 0:
+                    stack[-1][1] += elapsed
+
+                counter.calls += 1
+                counter.total += elapsed
+                counter.own += own
+                if blocks is not None:
+                    counter.blocks += blocks(*args, **kwargs)
+                if caller is not None:
+                    entry = counter.callers.setdefault(caller, [0, 0, 0])
+                    entry[0] += 1
+                    entry[1] += own
+                    entry[2] += elapsed
+                profiler.stacks[path] += own
+
+        return wrapper
+
+    @contextmanager
+    def attached(self, log: Optional[EventLog] = None):
+        """Mede os métodos de `HOOKS` (e a escrita do registro de eventos,
+        se `log` for dado) enquanto o bloco executa"""
+        hooks = list(HOOKS)
+        if log is not None:
+            hooks.append((type(log), "write", lambda self, events: len(events)))
+
+        originals = []
+        for cls, method, blocks in hooks:
+            original = cls.__dict__.get(method)
+            function = getattr(cls, method)
+            name = function.__qualname__
+            originals.append((cls, method, original))
+            setattr(cls, method, self.timed(name, function, blocks))
+        try:
+            yield self
+        finally:
+            for cls, method, original in reversed(originals):
+                if original is None:
+                    delattr(cls, method)
+                else:
+                    setattr(cls, method, original)
+
+    def print_table(self, stream: TextIO):
+        stream.write(
+            f"{'método':<40}{'chamadas':>10}{'blocos':>12}"
+            f"{'total (ms)':>12}{'próprio (ms)':>14}{'ns/chamada':>12}\n"
+        )
+        counters = sorted(self.counters.items(), key=lambda item: -item[1].total)
+        for name, counter in counters:
+            if counter.calls == 0:
+                continue
+            stream.write(
+                f"{name:<40}{counter.calls:>10}{counter.blocks:>12}"
+                f"{counter.total / 1e6:>12.2f}{counter.own / 1e6:>14.2f}"
+                f"{counter.total // counter.calls:>12}\n"
+            )
+
+    def dump_pstats(self, path: str):
+        """Grava no formato lido por `pstats.Stats(path)` (e snakeviz etc.)"""
+        codes = {name: counter.code for name, counter in self.counters.items()}
+        stats = {}
+        for name, counter in self.counters.items():
+            if counter.calls == 0:
+                continue
+            callers = {
+                codes[caller]: (calls, calls, own / 1e9, total / 1e9)
+                for caller, (calls, own, total) in counter.callers.items()
+            }
+            stats[counter.code] = (
+                counter.calls,
+                counter.calls,
+                counter.own / 1e9,
+                counter.total / 1e9,
+                callers,
+            )
+        with open(path, "wb") as f:
+            marshal.dump(stats, f)
+
+    def dump_folded(self, path: str):
+        """Grava as pilhas no formato "a;b;c <ns>" dos geradores de
+        flamegraph (flamegraph.pl, speedscope, inferno)"""
+        with open(path, "w") as f:
+            for stack, own in sorted(self.stacks.items()):
+                f.write(f"{stack} {own}\n")
@@ -0,0 +1,655 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from simos.events import EventKind, EventLog, QuietLog
+from simos.loader import OperationTrace, ProcessTrace
+from simos.managers.memory import OutOfMemoryError
+from simos.managers.process import PCBError, SchedulerError, State
+from simos.managers.resource import Modem, Printer, Resource, Sata, Scanner
+from simos.managers.storage import FileNotExistError, FilePermissionError, OutOfStorageError
+from simos.types import Instruction, ScheduleEvent, SimulationError, SystemError
+
+
+# Motor de referência do harness diferencial (ver `simos.differential`):
+# os gerenciadores e o laço de ticks da primeira versão do simulador,
+# congelados. A memória e o disco são listas de blocos varridas a cada
+# busca, todo tick é simulado e os processos novos e as filas são
+# percorridos inteiros a cada tick. Nada aqui deve ser otimizado: é o
+# comportamento contra o qual as versões novas são comparadas.
+#
+# Em relação à primeira versão, sempre mudam:
+# - os `print` viram eventos do `EventLog`, com os mesmos textos;
+# - o laço para quando nenhum processo pode mais andar (todos os
+#   restantes bloqueados para sempre), e não no tick 100.
+#
+# Com `fixes` (ligado por padrão) entram também as correções de defeitos
+# que mudaram o comportamento do simulador de propósito, e só elas:
+# - a promoção por envelhecimento baixa a prioridade do processo
+#   promovido, e não a do último processo visto na fila;
+# - no desbloqueio ao liberar memória, quem espera recebe o próprio
+#   tamanho, no próprio endereço, sem sair da fila se não couber, e pede o
+#   próprio recurso. Cada região tem sua fila, e quem não cabe segura os
+#   demais.
+# Com `fixes=False` o código original é reproduzido, com os defeitos (e
+# pode falhar ao acordar um processo que já terminou).
+
+
+@dataclass
+class CreateFileInstruction(Instruction):
+    filename: str
+    blocks: int
+
+    def execute(self, process: "PCB", storage: "FileManager", log: EventLog, time: int):
+        try:
+            address = storage.create_file(process.pid, self.filename, self.blocks)
+            log.record(EventKind.CREATE_FILE, time, process.pid, self.filename, address)
+        except SystemError as e:
+            log.record(EventKind.CREATE_FILE_ERROR, time, process.pid, self.filename, str(e))
+
+
+@dataclass
+class DeleteFileInstruction(Instruction):
+    filename: str
+
+    def execute(self, process: "PCB", storage: "FileManager", log: EventLog, time: int):
+        try:
+            storage.delete_file(process.pid, self.filename, process.priority == 0)
+            log.record(EventKind.DELETE_FILE, time, process.pid, self.filename)
+        except SystemError as e:
+            log.record(EventKind.DELETE_FILE_ERROR, time, process.pid, self.filename, str(e))
+
+
+@dataclass
+class PCB:
+    pid: int
+    priority: int
+
+    # Tempo para ficar pronto logo após ser criado (incialização)
+    init_duration: int
+    # Tempo que vai ficar na cpu para completar a tarefa
+    cpu_duration: int
+
+    # Endereço da memória e espaço alocado (em blocos)
+    memory_offset: int
+    allocated_blocks: int
+
+    instructions: list[Instruction] = field(default_factory=list)
+    last_instruction: int = -1
+
+    use_resources: list[Resource] = field(default_factory=list)
+    state: State = State.NEW
+
+    spent_waiting_time: int = 0
+    consumed_cpu_time: int = 0
+
+    arrive_queue_time: Optional[int] = None
+
+
+class MemoryManager:
+    def __init__(self):
+        # Inicializa 1024 blocos de memória como livres (None)
+        self.memory = [None for _ in range(1024)]
+        self.waiting_queue: deque[tuple[int, int, bool]] = deque()
+
+    def allocate_real_time(self, pid: int, space: int):
+        # Tenta alocar nos primeiros 64 blocos (tempo real)
+        offset = self.find_fit(space, 0, 64)
+        if offset is None:
+            self.waiting_queue.append((pid, space, True))
+            raise OutOfMemoryError(f"Memória insuficiente para processo {pid} em tempo real.")
+
+        self.allocate(pid, offset, space)
+        return offset
+
+    def allocate_user(self, pid: int, space: int):
+        # Tenta alocar nos blocos 64 a 1023 (usuário)
+        offset = self.find_fit(space, 64, 1024)
+        if offset is None:
+            self.waiting_queue.append((pid, space, False))
+            raise OutOfMemoryError(f"Memória insuficiente para processo {pid} de usuário.")
+
+        self.allocate(pid, offset, space)
+        return offset
+
+    def allocate(self, pid: int, offset: int, space: int):
+        # Marca os blocos como ocupados pelo processo
+        for i in range(offset, offset + space):
+            self.memory[i] = pid
+
+    def free(self, offset: int, space: int) -> list[int]:
+        # Libera os blocos ocupados a partir de um offset (caminho
+        # original, com os defeitos)
+        for i in range(offset, offset + space):
+            self.memory[i] = None
+
+        unblocked: list[int] = []
+        while len(self.waiting_queue) > 0:
+            pid, size, is_realtime = self.waiting_queue.popleft()
+            start, end = (0, 64) if is_realtime else (64, 1024)
+            address = self.find_fit(size, start, end)
+            if address is None:
+                return unblocked
+            else:
+                self.allocate(pid, address, space)
+                unblocked.append(pid)
+
+        return unblocked
+
+    def free_fixed(self, offset: int, space: int) -> list[tuple[int, int]]:
+        # Libera os blocos e aloca, na ordem de chegada, quem espera pela
+        # região liberada, até o primeiro que não couber. Retorna
+        # (pid, offset) de cada processo que recebeu memória.
+        for i in range(offset, offset + space):
+            self.memory[i] = None
+
+        region = offset < 64
+        start, end = (0, 64) if region else (64, 1024)
+        unblocked: list[tuple[int, int]] = []
+        for entry in list(self.waiting_queue):
+            pid, size, is_realtime = entry
+            if is_realtime != region:
+                continue
+            address = self.find_fit(size, start, end)
+            if address is None:
+                break
+            self.waiting_queue.remove(entry)
+            self.allocate(pid, address, size)
+            unblocked.append((pid, address))
+
+        return unblocked
+
+    def find_fit(self, size: int, start: int, end: int):
+        # Busca um espaço contíguo livre entre os índices [start, end)
+        count = 0
+        for i in range(start, end):
+            if self.memory[i] is None:
+                count += 1
+                if count == size:
+                    return i - size + 1
+            else:
+                count = 0
+
+        return None
+
+
+class Metadata:
+    def __init__(self, name: str, owner: int, address: int, size: int):
+        self.name = name
+        self.owner = owner
+        self.address = address
+        self.size = size
+
+
+class FileManager:
+    def __init__(self, disk_size: int, initial_files: list[tuple[str, int, int]]):
+        # Inicializa os blocos do disco
+        self.blocks: list[Optional[str]] = [None for _ in range(disk_size)]
+        self.metadata: dict[str, Metadata] = {}
+
+        # Arquivos iniciais são atribuídos ao "dono" -1 (tempo real)
+        for filename, address, size in initial_files:
+            file = Metadata(name=filename, owner=-1, address=address, size=size)
+            self.metadata[filename] = file
+
+            # Marca os blocos como ocupados pelo arquivo
+            for i in range(address, address + size):
+                self.blocks[i] = filename
+
+    def create_file(self, pid: int, filename: str, size: int):
+        # Busca espaço contíguo disponível
+        address = self.first_fit(size)
+        if address is None:
+            raise OutOfStorageError(f"Sem espaço livre para criar arquivo {filename}.")
+
+        # Cria metadados e marca os blocos
+        file = Metadata(name=filename, owner=pid, address=address, size=size)
+        self.metadata[filename] = file
+
+        for i in range(address, address + size):
+            self.blocks[i] = filename
+
+        return address
+
+    def delete_file(self, pid: int, name: str, is_real_time: bool = False):
+        file = self.metadata.get(name)
+        if file is None:
+            raise FileNotExistError(f"Arquivo {name} não existe.")
+
+        # Somente o dono ou um processo de tempo real pode deletar
+        if not is_real_time and file.owner != pid:
+            raise FilePermissionError(
+                f"Processo {pid} não tem permissão para deletar arquivo {name}."
+            )
+
+        # Libera os blocos e remove metadados
+        for i in range(file.address, file.address + file.size):
+            self.blocks[i] = None
+
+        del self.metadata[name]
+
+    def first_fit(self, size: int):
+        # Busca o primeiro espaço contíguo livre com tamanho suficiente
+        count = 0
+        for i in range(len(self.blocks)):
+            if self.blocks[i] is None:
+                count += 1
+                if count == size:
+                    return i - size + 1
+            else:
+                count = 0
+
+        return None
+
+    def close(self):
+        pass
+
+
+class ResourceManager:
+    def __init__(self, available_resources: set[Resource]):
+        self.available_resources = available_resources
+
+        # Uma fila de espera para cada recurso
+        self.wait_queues: dict[Resource, deque[int]] = {
+            r: deque() for r in available_resources
+        }
+
+    def acquire(self, pid: int, resource: Resource) -> bool:
+        # Se recurso está disponível, aloca para o processo
+        if resource in self.available_resources:
+            self.available_resources.remove(resource)
+            return True
+
+        # Caso contrário, adiciona PID à fila de espera
+        self.wait_queues[resource].append(pid)
+        return False
+
+    def release(self, resource: Resource) -> Optional[int]:
+        # Libera o recurso
+        self.available_resources.add(resource)
+
+        # Se houver processos esperando, aloca para o próximo
+        if len(self.wait_queues[resource]) > 0:
+            next_pid = self.wait_queues[resource].popleft()
+            self.available_resources.remove(resource)
+            return next_pid
+
+        return None
+
+
+class ProcessManager:
+    def __init__(
+        self,
+        memory: MemoryManager,
+        resource: ResourceManager,
+        storage: FileManager,
+        log: EventLog,
+        fixes: bool = True,
+    ):
+        self.memory = memory
+        self.resource = resource
+        self.storage = storage
+        self.log = log
+        self.fixes = fixes
+
+        self.process_table: dict[int, PCB] = {}
+
+        self.new_processes: set[int] = set()
+        self.blocked_processes: set[int] = set()
+
+        self.realtime_queue: deque[int] = deque()
+        self.user_queue: list[deque[int]] = [deque(), deque(), deque()]
+
+        # Ignora-se a primeira fila já que é a mais prioritária
+        self.aging_thresholds: list[int] = [3, 5]
+
+        self.terminated: list[int] = []
+
+        self.running: Optional[int] = None
+        self.quantum: int = 1  # 1 ms
+
+        # Último tick simulado
+        self.time = 0
+
+    def add_process(self, process: PCB):
+        """Insere um novo processo na tabela e na fila de \"novos\" """
+        self.process_table[process.pid] = process
+        self.new_processes.add(process.pid)
+
+    def allocate_memory(self, process: PCB):
+        offset = None
+        if process.priority == 0:
+            offset = self.memory.allocate_real_time(process.pid, process.allocated_blocks)
+        elif process.priority <= 3:
+            offset = self.memory.allocate_user(process.pid, process.allocated_blocks)
+        else:
+            raise PCBError(f"A prioridade {process.priority} não existe.")
+
+        process.memory_offset = offset
+
+    def enqueue_process(self, process: PCB, time: int):
+        # Coloca um processo na fila de "ready"
+        if process.priority == 0:
+            process.arrive_queue_time = time
+            self.realtime_queue.append(process.pid)
+        elif process.priority <= 3:
+            process.arrive_queue_time = time
+            self.user_queue[process.priority - 1].append(process.pid)
+        else:
+            raise SchedulerError(f"A prioridade {process.priority} não existe.")
+
+    def next_process(self):
+        self.running = None
+
+        if len(self.realtime_queue) > 0:
+            pid = self.realtime_queue.popleft()
+            self.running = pid
+        else:
+            for queue in self.user_queue:
+                if len(queue) > 0:
+                    pid = queue.popleft()
+                    self.running = pid
+                    break
+
+        if self.running is not None:
+            process = self.process_table[pid]
+            process.spent_waiting_time = 0
+            process.state = State.RUNNING
+
+        return self.running
+
+    def idle(self) -> bool:
+        # Nenhum processo rodando, pronto ou por chegar: os bloqueados não
+        # têm mais quem os acorde
+        return (
+            self.running is None
+            and len(self.new_processes) == 0
+            and len(self.realtime_queue) == 0
+            and all(len(queue) == 0 for queue in self.user_queue)
+        )
+
+    def active_processes(self) -> list[PCB]:
+        # Processos admitidos e ainda não terminados, sem percorrer a
+        # tabela inteira (o harness olha o estado a cada tick)
+        pids = list(self.blocked_processes) + list(self.realtime_queue)
+        for queue in self.user_queue:
+            pids.extend(queue)
+        if self.running is not None:
+            pids.append(self.running)
+        return [self.process_table[pid] for pid in pids]
+
+    def admit_process(self, process: PCB, time: int):
+        self.new_processes.remove(process.pid)
+        process.spent_waiting_time = 0
+
+        try:
+            self.allocate_memory(process)
+        except OutOfMemoryError:
+            self.log.record(EventKind.BLOCK_MEMORY, time, process.pid)
+            process.state = State.BLOCKED
+            self.blocked_processes.add(process.pid)
+            return
+
+        if len(process.use_resources) > 0:
+            if not self.resource.acquire(process.pid, process.use_resources[0]):
+                self.log.record(EventKind.BLOCK_RESOURCE, time, process.pid)
+                process.state = State.BLOCKED
+                self.blocked_processes.add(process.pid)
+                return
+
+        self.log.record(EventKind.ADMIT, time, process.pid)
+
+        self.enqueue_process(process, time)
+        process.state = State.READY
+
+    def unblock_process(self, process: PCB, time: int):
+        self.log.record(EventKind.UNBLOCK, time, process.pid)
+
+        self.blocked_processes.remove(process.pid)
+        self.enqueue_process(process, time)
+        process.state = State.READY
+
+    def run(self, time: int):
+        self.time = time
+
+        # Adiciona o tempo gasto pelos processos nas suas filas
+        # Isso simula a interrupção de hardware que acontece
+        # quando chega um novo processo.
+        for pid in list(self.new_processes):
+            process = self.process_table[pid]
+            if process.spent_waiting_time >= process.init_duration:
+                self.admit_process(process, time)
+            else:
+                process.spent_waiting_time += 1
+
+        # Incrementar tempo gasto de espera para processos nas filas
+        # READY de usuário (AGING)
+        # Ignora-se a fila mais prioritária
+        for level in range(1, len(self.user_queue)):
+            queue = self.user_queue[level]
+            threshold = self.aging_thresholds[level - 1] * self.quantum
+            to_promote: list[int] = []
+
+            for pid in queue:
+                process = self.process_table[pid]
+                process.spent_waiting_time += 1
+                if process.spent_waiting_time >= threshold:
+                    to_promote.append(pid)
+
+            for pid in to_promote:
+                self.log.record(EventKind.PROMOTE, time, pid, level)
+                if self.fixes:
+                    process = self.process_table[pid]
+                # Sem a correção, `process` é o último processo visto no
+                # laço acima, que nem sempre é o promovido
+                process.priority -= 1
+                queue.remove(pid)
+                self.user_queue[level - 1].append(pid)
+                self.process_table[pid].spent_waiting_time = 0
+
+        # Roda o processo e verifica se ele disparou algum evento
+        event = self.run_process(time)
+        if event is None:
+            return
+
+        elif isinstance(event, ScheduleEvent):
+            self.run_dispatcher(time)
+        else:
+            raise ValueError("Evento de sistema não existe.")
+
+    def run_process(self, time: int):
+        if self.running is None:
+            return ScheduleEvent()
+
+        pid = self.running
+        process = self.process_table[pid]
+
+        if 0 <= process.last_instruction + 1 < len(process.instructions):
+            process.last_instruction += 1
+            self.log.record(EventKind.INSTRUCTION, time, pid, process.last_instruction + 1)
+            process.instructions[process.last_instruction].execute(
+                process, self.storage, self.log, time
+            )
+
+        # A cada tick consome um de tempo (para efeitos de simulação)
+        process.consumed_cpu_time += 1
+
+        if process.consumed_cpu_time >= process.cpu_duration:
+            # Sinalizamos para o escalonador que esse processo
+            # terminou
+            self.log.record(EventKind.COMPLETE, time, pid)
+            process.state = State.TERMINATED
+            return ScheduleEvent()
+
+        elif process.priority > 0:
+            # Verifica preempção
+
+            # Se chegou um processo de prioridade maior, deve escalonar
+            # Simula interrupção de sistema
+            greater_priority_arrived = len(self.realtime_queue) > 0
+            for queue in self.user_queue[: process.priority - 1]:
+                if greater_priority_arrived:
+                    break
+
+                if len(queue) > 0:
+                    greater_priority_arrived = True
+
+            # Se existe algum processo na mesma fila de espera desse
+            # processo. Se não existir, não tem porque chamar o dispatcher
+            any_process_in_queue = len(self.user_queue[process.priority - 1]) > 0
+
+            if greater_priority_arrived or (time % self.quantum == 0 and any_process_in_queue):
+                # Sinalizamos para o dispatcher que esse processo
+                # não foi terminado mas deve ser recolocado na fila
+                self.log.record(EventKind.PREEMPT, time, pid)
+                process.state = State.READY
+                return ScheduleEvent()
+
+    def release_process(self, process: PCB, time: int):
+        # Caminho original: os processos acordados pela memória tentam o
+        # recurso do processo que terminou, e o primeiro que falha
+        # interrompe os demais
+        unblocked_pids = self.memory.free(process.memory_offset, process.allocated_blocks)
+        for unblocked_pid in unblocked_pids:
+            unblocked_process = self.process_table[unblocked_pid]
+            if len(process.use_resources) > 0:
+                if not self.resource.acquire(process.pid, process.use_resources[0]):
+                    break
+
+            self.unblock_process(unblocked_process, time)
+
+        if len(process.use_resources) > 0:
+            unblocked_pid = self.resource.release(process.use_resources[0])
+            if unblocked_pid is not None:
+                unblocked_process = self.process_table[unblocked_pid]
+                self.unblock_process(unblocked_process, time)
+
+    def release_process_fixed(self, process: PCB, time: int):
+        # Cada processo acordado pela memória fica com o próprio endereço
+        # e pede o próprio recurso; se ele estiver ocupado, passa a
+        # esperar por ele
+        unblocked = self.memory.free_fixed(process.memory_offset, process.allocated_blocks)
+        for unblocked_pid, offset in unblocked:
+            unblocked_process = self.process_table[unblocked_pid]
+            unblocked_process.memory_offset = offset
+            if len(unblocked_process.use_resources) > 0 and not self.resource.acquire(
+                unblocked_pid, unblocked_process.use_resources[0]
+            ):
+                self.log.record(EventKind.BLOCK_RESOURCE, time, unblocked_pid)
+                continue
+
+            self.unblock_process(unblocked_process, time)
+
+        if len(process.use_resources) > 0:
+            unblocked_pid = self.resource.release(process.use_resources[0])
+            if unblocked_pid is not None:
+                unblocked_process = self.process_table[unblocked_pid]
+                self.unblock_process(unblocked_process, time)
+
+    def run_dispatcher(self, time: int):
+        pid = None
+        if self.running is None:
+            pid = self.next_process()
+        else:
+            process = self.process_table[self.running]
+            if process.state == State.TERMINATED:
+                self.terminated.append(self.running)
+                if self.fixes:
+                    self.release_process_fixed(process, time)
+                else:
+                    self.release_process(process, time)
+                pid = self.next_process()
+            elif process.state == State.READY:
+                self.enqueue_process(process, time)
+                pid = self.next_process()
+            else:
+                raise SimulationError(
+                    "Estado inconsistente de processo para fazer troca de contexto."
+                )
+
+        if pid is not None:
+            process = self.process_table[pid]
+
+            printers = process.use_resources.count(lambda r: isinstance(r, Printer))
+            scanners = process.use_resources.count(lambda r: isinstance(r, Scanner))
+            modems = process.use_resources.count(lambda r: isinstance(r, Modem))
+            satas = process.use_resources.count(lambda r: isinstance(r, Sata))
+
+            # Uma única CPU, a 0
+            self.log.record(
+                EventKind.DISPATCH,
+                time,
+                process.pid,
+                process.memory_offset,
+                process.allocated_blocks,
+                process.priority,
+                printers,
+                scanners,
+                modems,
+                satas,
+                0,
+            )
+
+
+class ReferenceSimulation:
+    """Execução do motor de referência sobre os traços já lidos, com a
+    interface usada pelo harness diferencial (step, run, manager, memory
+    e storage). Todos os processos são criados no início, como na
+    primeira versão."""
+
+    def __init__(
+        self,
+        processes: ProcessTrace,
+        operations: OperationTrace,
+        log: Optional[EventLog] = None,
+        fixes: bool = True,
+    ):
+        self.memory = MemoryManager()
+        self.resource = ResourceManager(set(processes.resources))
+        self.storage = FileManager(operations.total_blocks, operations.initial_files)
+        self.manager = ProcessManager(
+            self.memory,
+            self.resource,
+            self.storage,
+            log if log is not None else QuietLog(),
+            fixes,
+        )
+
+        self.count = len(processes)
+        for pid in range(self.count):
+            pcb = PCB(
+                pid=pid,
+                priority=processes.priority[pid],
+                init_duration=processes.init_duration[pid],
+                cpu_duration=processes.cpu_duration[pid],
+                memory_offset=0,
+                allocated_blocks=processes.allocated_blocks[pid],
+                use_resources=processes.use_resources(pid),
+            )
+            for row in operations.by_pid.get(pid, ()):
+                if operations.create[row]:
+                    instruction = CreateFileInstruction(
+                        operations.filename(row), operations.blocks[row]
+                    )
+                else:
+                    instruction = DeleteFileInstruction(operations.filename(row))
+                pcb.instructions.append(instruction)
+            self.manager.add_process(pcb)
+
+        self.clock = 1
+        self.steps = 0
+
+    def step(self) -> bool:
+        """Simula o próximo tick. Retorna False se a simulação acabou."""
+        pm = self.manager
+        if len(pm.terminated) >= self.count or (self.clock > 1 and pm.idle()):
+            return False
+
+        pm.run(self.clock)
+        self.clock += 1
+        self.steps += 1
+        return True
+
+    def run(self):
+        while self.step():
+            pass
@@ -0,0 +1,263 @@
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from simos.events import Event, EventLog, QuietLog, render
+from simos.loader import OperationTrace, ProcessTrace, load_operations, load_processes
+from simos.simulation import Simulation, make_config
+
+
+# Traços já lidos neste processo, pelos arquivos e suas datas de
+# modificação. Cada processo do pool tem o seu.
+TRACE_CACHE: dict[tuple, tuple[ProcessTrace, OperationTrace]] = {}
+
+
+def load_traces(process_file: str, ops_file: str) -> tuple[ProcessTrace, OperationTrace, bool]:
+    """Traços dos arquivos, lidos uma única vez enquanto eles não mudarem.
+    Retorna também se vieram do cache."""
+    key = (
+        process_file,
+        os.stat(process_file).st_mtime_ns,
+        ops_file,
+        os.stat(ops_file).st_mtime_ns,
+    )
+    traces = TRACE_CACHE.get(key)
+    if traces is not None:
+        return traces[0], traces[1], True
+
+    processes = load_processes(process_file)
+    operations = load_operations(ops_file, processes)
+    TRACE_CACHE[key] = (processes, operations)
+    return processes, operations, False
+
+
+class QueueLog(EventLog):
+    """Manda os eventos, em lotes, para a fila do serviço, marcados com a
+    sessão"""
+
+    def __init__(self, events: queue.Queue, session: int, format: str):
+        super().__init__()
+        self.events = events
+        self.session = session
+        self.format = format
+
+    def write(self, events: list[Event]):
+        if self.format == "text":
+            batch = [render(event) for event in events]
+        else:
+            batch = [
+                {
+                    "kind": event.kind.name.lower(),
+                    "time": event.time,
+                    "pid": event.pid,
+                    "data": event.data,
+                }
+                for event in events
+            ]
+        self.events.put((self.session, batch))
+
+
+def run_session(request: dict, events: queue.Queue, session: int) -> dict:
+    """Roda uma simulação pedida ao serviço (em um processo do pool).
+
+    Os eventos vão para `events`, como (sessão, lote), enquanto são
+    produzidos; o lote None marca o fim. Retorna o resumo da execução."""
+    try:
+        start = time.perf_counter()
+        # Avisos do carregamento (ex.: processo inexistente) vão na
+        # resposta, não na saída do serviço
+        warnings = io.StringIO()
+        with contextlib.redirect_stdout(warnings):
+            processes, operations, cached = load_traces(
+                request["processes"], request["operations"]
+            )
+        loaded = time.perf_counter()
+
+        config = make_config(request.get("config", {}))
+        format = request.get("log", "jsonl")
+        if format not in ("jsonl", "text", "quiet"):
+            raise ValueError(f"Formato de registro desconhecido: {format}")
+
+        log = QueueLog(events, session, format) if format != "quiet" else QuietLog()
+        simulation = Simulation(
+            processes, operations, log, request.get("tick", False), config
+        )
+        metrics = simulation.collect_metrics()
+
+        try:
+            with contextlib.redirect_stdout(warnings):
+                simulation.run()
+            log.close()
+
+            result = {
+                "metrics": metrics.summary(),
+                "steps": simulation.steps,
+                "cached_traces": cached,
+                "load_seconds": loaded - start,
+                "run_seconds": time.perf_counter() - loaded,
+                "warnings": warnings.getvalue().splitlines(),
+            }
+            if request.get("disk", False):
+                result["disk"] = simulation.storage.blocks
+            return result
+        finally:
+            simulation.storage.close()
+    finally:
+        events.put((session, None))
+
+
+Send = Callable[[dict], Awaitable[None]]
+
+
+class SimulationService:
+    """Serviço de longa duração que roda simulações pedidas em JSON.
+
+    Cada pedido é uma sessão independente, rodada em um processo do pool;
+    seus eventos são devolvidos enquanto são produzidos, em mensagens
+    {"id", "events"}, e a sessão termina com {"id", "result"} ou
+    {"id", "error"}. Os traços ficam em cache nos processos do pool.
+
+    Os processos do pool põem os eventos de todas as sessões em uma única
+    fila do `multiprocessing.Manager`. Uma thread lê essa fila e entrega
+    cada lote à `asyncio.Queue` da sua sessão com `call_soon_threadsafe`,
+    então as sessões só esperam, sem consultar a fila de tempos em tempos.
+    """
+
+    def __init__(self, workers: Optional[int] = None, executor: Optional[Executor] = None):
+        # Os processos do pool são criados sob demanda, com conexões já
+        # abertas; com fork eles herdariam os sockets dos clientes, que
+        # não fechariam mais. O forkserver cria processos sem eles.
+        context = None
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        self.manager = multiprocessing.Manager()
+        self.events = self.manager.Queue()
+
+        # Fila de cada sessão em andamento, pelo número da sessão; só é
+        # usada pela thread do laço de eventos
+        self.sessions: dict[int, asyncio.Queue] = {}
+        self.next_session = 0
+        self.reader: Optional[threading.Thread] = None
+
+    def start_reader(self, loop: asyncio.AbstractEventLoop):
+        if self.reader is not None:
+            return
+
+        def read():
+            while True:
+                session, batch = self.events.get()
+                if session is None:
+                    break
+                loop.call_soon_threadsafe(self.deliver, session, batch)
+
+        self.reader = threading.Thread(target=read, name="simos-events", daemon=True)
+        self.reader.start()
+
+    def deliver(self, session: int, batch: Optional[list]):
+        inbox = self.sessions.get(session)
+        if inbox is not None:
+            inbox.put_nowait(batch)
+
+    async def handle(self, line: str, send: Send):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            for key in ("processes", "operations"):
+                if key not in request:
+                    raise ValueError(f"Pedido sem o campo '{key}'")
+        except (ValueError, AttributeError) as e:
+            await send({"id": request_id, "error": str(e)})
+            return
+
+        loop = asyncio.get_running_loop()
+        self.start_reader(loop)
+        session = self.next_session
+        self.next_session += 1
+        inbox: asyncio.Queue = asyncio.Queue()
+        self.sessions[session] = inbox
+        future = loop.run_in_executor(
+            self.executor, run_session, request, self.events, session
+        )
+
+        # Se o pool quebrar, `run_session` não chega a marcar o fim
+        def broken(future: asyncio.Future):
+            if not future.cancelled() and isinstance(future.exception(), BrokenExecutor):
+                inbox.put_nowait(None)
+
+        future.add_done_callback(broken)
+
+        # Repassa os lotes de eventos até a marca de fim
+        try:
+            while True:
+                batch = await inbox.get()
+                if batch is None:
+                    break
+                await send({"id": request_id, "events": batch})
+        finally:
+            del self.sessions[session]
+
+        try:
+            result = await future
+        except Exception as e:
+            await send({"id": request_id, "error": f"{type(e).__name__}: {e}"})
+            return
+        await send({"id": request_id, "result": result})
+
+    async def serve_lines(self, reader: asyncio.StreamReader, send: Send):
+        """Atende os pedidos (um por linha) de `reader`, em paralelo"""
+        sessions = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.create_task(self.handle(line.decode(), send))
+                sessions.add(task)
+                task.add_done_callback(sessions.discard)
+        if len(sessions) > 0:
+            await asyncio.gather(*sessions)
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        stdin = os.fdopen(0, "rb", 0, closefd=False)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), stdin)
+
+        stdout = os.fdopen(1, "wb", 0, closefd=False)
+
+        async def send(message: dict):
+            stdout.write((json.dumps(message, ensure_ascii=False) + "\n").encode())
+
+        await self.serve_lines(reader, send)
+
+    async def serve_socket(self, path: str):
+        async def client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            async def send(message: dict):
+                writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode())
+                await writer.drain()
+
+            try:
+                await self.serve_lines(reader, send)
+            finally:
+                writer.close()
+
+        server = await asyncio.start_unix_server(client, path)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+        if self.reader is not None:
+            self.events.put((None, None))
+            self.reader.join()
+        self.manager.shutdown()
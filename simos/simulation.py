@@ -0,0 +1,234 @@
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+from simos.events import EventLog
+from simos.loader import OperationTrace, ProcessTrace
+from simos.managers.memory import MemoryManager
+from simos.managers.placement import Fragmentation
+from simos.managers.process import ProcessManager
+from simos.managers.resource import ResourceManager
+from simos.managers.storage import DiskUsage, FileManager
+
+
+# Importados só quando usados, para não pesar no início do programa
+if TYPE_CHECKING:
+    from simos.metrics import MetricsCollector
+
+
+class SimulationConfig(NamedTuple):
+    """Parâmetros dos gerenciadores (os padrões são os do simulador).
+    Tupla nomeada em vez de dataclass: `dataclasses` importa `inspect`,
+    o que pesa no início de execuções curtas."""
+
+    quantum: int = 1
+    aging_thresholds: tuple[int, ...] = (3, 5)
+
+    # CPUs simuladas e se cada uma tem suas próprias filas READY (ver
+    # `ProcessManager.configure_cpus`)
+    cpus: int = 1
+    per_cpu_queues: bool = False
+
+    memory_size: int = 1024
+    realtime_memory: int = 64
+
+    # Tamanho do disco (por padrão, o do arquivo de operações)
+    disk_size: Optional[int] = None
+
+    # Imagem de disco persistente (ver `MappedFileManager`). Se ela já
+    # existir, o disco é lido dela e não do arquivo de operações.
+    disk_image: Optional[str] = None
+
+    # Política de posicionamento da memória e do disco (ver
+    # `simos.managers.placement.POLICIES`)
+    placement: str = "first-fit"
+
+    # Compactação da memória para desbloquear processos (ver
+    # `MemoryManager.compact`), com limite opcional de blocos movidos
+    compaction: bool = False
+    max_compaction_cost: Optional[int] = None
+
+
+def make_config(options: dict) -> SimulationConfig:
+    """Configuração a partir de um dicionário (ex.: lido de JSON)"""
+    unknown = set(options) - set(SimulationConfig._fields)
+    if len(unknown) > 0:
+        raise ValueError(f"Parâmetros desconhecidos: {', '.join(sorted(unknown))}")
+
+    options = dict(options)
+    if "aging_thresholds" in options:
+        options["aging_thresholds"] = tuple(options["aging_thresholds"])
+    return SimulationConfig(**options)
+
+
+class FragmentationSample(NamedTuple):
+    tick: int
+    realtime: Fragmentation
+    user: Fragmentation
+    disk: Fragmentation
+
+
+def mean_fragmentation(samples: list[FragmentationSample], area: str) -> float:
+    """Razão de fragmentação externa média de uma área, ponderada pelo
+    tempo que cada amostra vale (até o próximo tick simulado)"""
+    total = weight = 0
+    for sample, following in zip(samples, samples[1:] + [None]):
+        duration = following.tick - sample.tick if following is not None else 1
+        total += getattr(sample, area).ratio * duration
+        weight += duration
+    return total / weight if weight else 0.0
+
+
+class Simulation:
+    """Uma execução do simulador sobre os arquivos de entrada já lidos.
+
+    Os PCBs só são criados quando o processo está para ser admitido. Por
+    padrão o relógio salta direto para o próximo tick em que algo
+    acontece; com `tick=True` todos os ticks são simulados.
+    """
+
+    def __init__(
+        self,
+        processes: ProcessTrace,
+        operations: OperationTrace,
+        log: Optional[EventLog] = None,
+        tick: bool = False,
+        config: SimulationConfig = SimulationConfig(),
+    ):
+        self.processes = processes
+        self.operations = operations
+        self.tick = tick
+        self.config = config
+
+        disk_size = config.disk_size
+        if disk_size is None:
+            disk_size = operations.total_blocks
+
+        self.memory = MemoryManager(
+            config.memory_size, config.realtime_memory, config.placement
+        )
+        self.memory.compaction = config.compaction
+        self.memory.max_compaction_cost = config.max_compaction_cost
+        # O gerenciador de recursos altera o conjunto recebido
+        self.resource = ResourceManager(set(processes.resources))
+        if config.disk_image is not None:
+            from simos.managers.disk_image import MappedFileManager
+
+            self.storage = MappedFileManager(
+                config.disk_image, disk_size, operations.initial_files, config.placement
+            )
+        else:
+            self.storage = FileManager(
+                disk_size, operations.initial_files, config.placement
+            )
+        self.manager = ProcessManager(self.memory, self.resource, self.storage, log)
+        self.manager.quantum = config.quantum
+        self.manager.aging_thresholds = list(config.aging_thresholds)
+        self.manager.compact_terminated = True
+        if config.cpus != 1 or config.per_cpu_queues:
+            self.manager.configure_cpus(config.cpus, config.per_cpu_queues)
+
+        # Processos ainda não criados, na ordem de admissão
+        self.order = processes.arrival_order()
+        self.position = 0
+
+        # Próximo tick a simular (None quando a simulação acabou)
+        self.clock: Optional[int] = 1
+        # Quantidade de ticks efetivamente simulados
+        self.steps = 0
+
+        # Fragmentação ao fim de cada tick simulado, se pedida (ver
+        # `track_fragmentation`)
+        self.fragmentation: Optional[list[FragmentationSample]] = None
+
+        # Ocupação do disco ao fim de cada tick simulado e trechos do
+        # disco alterados em cada um, se pedidos
+        self.disk_usage: Optional[list[tuple[int, DiskUsage]]] = None
+        self.disk_changes: Optional[list[tuple[int, int, int, Optional[str]]]] = None
+
+    def track_fragmentation(self):
+        self.fragmentation = []
+
+    def track_disk_usage(self):
+        self.disk_usage = []
+
+    def track_disk_changes(self):
+        """Registra os trechos do disco alterados a cada tick; os arquivos
+        já existentes entram como alterações do tick 0"""
+        self.storage.track_changes()
+        self.disk_changes = [(0, *change) for change in self.storage.drain_changes()]
+
+    def collect_metrics(self) -> "MetricsCollector":
+        """Liga a coleta de métricas da execução (ver `simos.metrics`)"""
+        from simos.metrics import MetricsCollector
+
+        self.manager.metrics = MetricsCollector(self.manager.cpus)
+        return self.manager.metrics
+
+    def step(self) -> bool:
+        """Simula o próximo tick. Retorna False se a simulação acabou."""
+        pm = self.manager
+        if self.clock is None or len(pm.terminated) >= len(self.processes):
+            self.clock = None
+            return False
+
+        clock = self.clock
+        arrival = self.next_arrival()
+        while arrival is not None and arrival <= clock:
+            pid = self.order[self.position]
+            pcb = self.processes.pcb(pid)
+            # Processos sem operações ficam sem lista de instruções
+            if pid in self.operations.by_pid:
+                pcb.instructions = self.operations.instructions(pid)
+            pm.add_process(pcb, arrival_time=0)
+            self.position += 1
+            arrival = self.next_arrival()
+
+        pm.run(clock)
+        self.steps += 1
+        if pm.metrics is not None:
+            memory_size = len(self.memory.memory)
+            disk_size = self.storage.disk_size
+            pm.metrics.sample(
+                clock,
+                memory_size - self.memory.placement.fragmentation(0, memory_size).free,
+                memory_size,
+                disk_size - self.storage.fragmentation().free,
+                disk_size,
+            )
+        if self.fragmentation is not None:
+            self.fragmentation.append(
+                FragmentationSample(
+                    clock,
+                    self.memory.fragmentation(True),
+                    self.memory.fragmentation(False),
+                    self.storage.fragmentation(),
+                )
+            )
+        if self.disk_usage is not None:
+            self.disk_usage.append((clock, self.storage.usage()))
+        if self.disk_changes is not None:
+            self.disk_changes.extend(
+                (clock, *change) for change in self.storage.drain_changes()
+            )
+
+        # Se nada mais pode acontecer (ex.: processos bloqueados para
+        # sempre), a simulação termina. Simulando todos os ticks, não é
+        # preciso procurar o próximo evento.
+        if self.tick:
+            busy = arrival is not None or pm.has_work()
+            self.clock = clock + 1 if busy else None
+        else:
+            next_clock = pm.next_event(clock)
+            if arrival is not None and (next_clock is None or arrival < next_clock):
+                next_clock = arrival
+            self.clock = next_clock
+        return True
+
+    def next_arrival(self) -> Optional[int]:
+        # Instante de admissão do próximo processo ainda não criado
+        if self.position >= len(self.order):
+            return None
+        return self.processes.admit_time(self.order[self.position])
+
+    def run(self):
+        while self.step():
+            pass
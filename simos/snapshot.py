@@ -0,0 +1,110 @@
+import bisect
+import os
+import pickle
+import zlib
+from typing import Optional
+
+from simos.events import EventLog, TextLog
+from simos.loader import OperationTrace, ProcessTrace
+from simos.simulation import Simulation
+
+
+# Identifica o formato (e sua versão) no início do arquivo
+MAGIC = b"SIMOSNAP3"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def save_snapshot(simulation: Simulation, path: str):
+    """Grava o estado dos gerenciadores e do relógio em um arquivo
+    binário compactado.
+
+    Os traços de entrada e o registro de eventos não fazem parte do
+    estado: são fornecidos de novo ao retomar (ver `load_snapshot`). O
+    disco em imagem (`disk_image`) fica fora do processo e continua
+    mudando depois do snapshot, então não pode ser gravado."""
+    if simulation.config.disk_image is not None:
+        raise SnapshotError("Snapshots não podem ser gravados com o disco em imagem.")
+
+    pm = simulation.manager
+    state = {
+        "clock": simulation.clock,
+        "steps": simulation.steps,
+        "tick": simulation.tick,
+        "config": simulation.config,
+        # O ProcessManager referencia os outros gerenciadores, que são
+        # gravados uma vez só
+        "manager": pm,
+    }
+
+    log = pm.log
+    pm.log = None
+    try:
+        data = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+    finally:
+        pm.log = log
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(zlib.compress(data))
+
+
+def load_snapshot(
+    path: str,
+    processes: ProcessTrace,
+    operations: OperationTrace,
+    log: Optional[EventLog] = None,
+) -> Simulation:
+    """Retoma a simulação gravada em `path`.
+
+    Os traços podem ser diferentes dos originais a partir do instante do
+    snapshot: os processos que ainda não tinham sido criados são lidos
+    dos traços recebidos."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError(f"{path} não é um snapshot do simulador.")
+        state = pickle.loads(zlib.decompress(f.read()))
+
+    simulation = Simulation.__new__(Simulation)
+    simulation.processes = processes
+    simulation.operations = operations
+    simulation.tick = state["tick"]
+    simulation.config = state["config"]
+    simulation.clock = state["clock"]
+    simulation.steps = state["steps"]
+    simulation.fragmentation = None
+    simulation.disk_usage = None
+    simulation.disk_changes = None
+
+    pm = state["manager"]
+    pm.log = log if log is not None else TextLog()
+    simulation.manager = pm
+    simulation.memory = pm.memory
+    simulation.resource = pm.resource
+    simulation.storage = pm.storage
+
+    # Os processos admitidos antes do próximo tick já foram criados
+    simulation.order = processes.arrival_order()
+    if simulation.clock is None:
+        simulation.position = len(simulation.order)
+    else:
+        simulation.position = bisect.bisect_left(
+            simulation.order, simulation.clock, key=processes.admit_time
+        )
+
+    return simulation
+
+
+def run_with_snapshots(simulation: Simulation, every: int, directory: str):
+    """Roda a simulação gravando um snapshot a cada `every` ticks
+    simulados, em `directory/tick-<instante>.snap`"""
+    os.makedirs(directory, exist_ok=True)
+
+    next_snapshot = every
+    while simulation.step():
+        time = simulation.manager.time
+        if time >= next_snapshot and simulation.clock is not None:
+            save_snapshot(simulation, os.path.join(directory, f"tick-{time}.snap"))
+            next_snapshot = (time // every + 1) * every
@@ -0,0 +1,106 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from simos.events import QuietLog
+from simos.loader import OperationTrace, ProcessTrace
+from simos.simulation import Simulation, SimulationConfig, mean_fragmentation
+
+
+# Traços lidos pelo processo principal e repassados uma única vez para
+# cada processo do pool (ver `init_worker`)
+TRACES: list[tuple[str, ProcessTrace, OperationTrace]] = []
+
+
+def init_worker(traces: list[tuple[str, ProcessTrace, OperationTrace]]):
+    global TRACES
+    TRACES = traces
+
+
+def run_case(trace: int, config: SimulationConfig) -> dict:
+    name, processes, operations = TRACES[trace]
+    simulation = Simulation(processes, operations, QuietLog(), config=config)
+    metrics = simulation.collect_metrics()
+    simulation.track_fragmentation()
+    simulation.run()
+
+    result = {
+        "trace": name,
+        "quantum": config.quantum,
+        "cpus": config.cpus,
+        "aging": "/".join(map(str, config.aging_thresholds)),
+        "realtime_memory": config.realtime_memory,
+        "disk_size": config.disk_size,
+        "placement": config.placement,
+        "compaction": compaction_name(config),
+    }
+    # Tempos, contagens e utilização vêm das métricas da execução (ver
+    # `simos.metrics`), as mesmas de `--metrics-json`
+    result.update(metrics.summary())
+    result["compactions"] = simulation.memory.compactions
+    result["moved_blocks"] = simulation.memory.moved_blocks
+    for area in ("user", "disk"):
+        result[f"{area}_fragmentation"] = mean_fragmentation(
+            simulation.fragmentation, area
+        )
+    return result
+
+
+def compaction_name(config: SimulationConfig) -> str:
+    if not config.compaction:
+        return "off"
+    if config.max_compaction_cost is None:
+        return "on"
+    return str(config.max_compaction_cost)
+
+
+def config_grid(
+    quantum: list[int],
+    aging: list[tuple[int, ...]],
+    realtime_memory: list[int],
+    disk_size: list[Optional[int]],
+    placement: list[str],
+    compaction: list[str],
+    cpus: list[int],
+    per_cpu_queues: bool = False,
+) -> list[SimulationConfig]:
+    """Todas as combinações dos valores. A compactação é "off", "on" (sem
+    limite de custo) ou o máximo de blocos movidos."""
+    configs = []
+    for q, a, r, d, p, c, n in itertools.product(
+        quantum, aging, realtime_memory, disk_size, placement, compaction, cpus
+    ):
+        configs.append(
+            SimulationConfig(
+                quantum=q,
+                aging_thresholds=a,
+                realtime_memory=r,
+                disk_size=d,
+                placement=p,
+                compaction=c != "off",
+                max_compaction_cost=int(c) if c not in ("off", "on") else None,
+                cpus=n,
+                per_cpu_queues=per_cpu_queues,
+            )
+        )
+    return configs
+
+
+def sweep(
+    traces: list[tuple[str, ProcessTrace, OperationTrace]],
+    configs: list[SimulationConfig],
+    workers: Optional[int] = None,
+) -> list[dict]:
+    """Roda cada configuração sobre cada traço em paralelo, um processo
+    por núcleo. Os resultados seguem a ordem (traço, configuração)."""
+    cases = list(itertools.product(range(len(traces)), configs))
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(traces,)
+    ) as executor:
+        return list(
+            executor.map(
+                run_case,
+                [trace for trace, _ in cases],
+                [config for _, config in cases],
+            )
+        )
@@ -0,0 +1,220 @@
+import struct
+import sys
+from array import array
+from typing import TYPE_CHECKING
+
+# O leitor de texto e os gerenciadores só são importados por quem lê ou
+# grava traços: `is_trace_file` roda em toda execução do dispatcher
+if TYPE_CHECKING:
+    from simos.loader import OperationTrace, ProcessTrace
+
+
+# Traço compilado: um cabeçalho e as colunas dos dois traços, gravadas
+# como estão na memória, para serem lidas sem interpretar texto.
+MAGIC = b"SIMOSTRC"
+VERSION = 1
+
+# magic, versão, ordem dos bytes (0 = little, 1 = big), processos,
+# operações, blocos do disco, arquivos iniciais, nomes de arquivo, textos
+# (nomes e códigos de impressora e SATA), bytes dos textos, impressoras,
+# SATAs, processos com operações e pids inexistentes
+HEADER = struct.Struct("<8sBB2x11I")
+
+BYTE_ORDERS = {"little": 0, "big": 1}
+
+
+class TraceFileError(Exception):
+    pass
+
+
+def is_trace_file(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def compile_trace(process_file: str, ops_file: str, path: str):
+    """Lê os traços em texto e grava o traço compilado em `path`"""
+    from simos.loader import load_operations, load_processes
+
+    processes = load_processes(process_file)
+    operations = load_operations(ops_file, processes)
+    save_trace(path, processes, operations)
+
+
+def save_trace(path: str, processes: "ProcessTrace", operations: "OperationTrace"):
+    # Nomes de arquivo primeiro (os índices das operações apontam para
+    # eles), depois os demais textos
+    strings = list(operations.names)
+    indices = {name: index for index, name in enumerate(strings)}
+
+    def string(text: str) -> int:
+        if text not in indices:
+            indices[text] = len(strings)
+            strings.append(text)
+        return indices[text]
+
+    for name, _, _ in operations.initial_files:
+        string(name)
+    printers = array("i")
+    for pid, code in processes.printers.items():
+        printers.extend((pid, string(code)))
+    satas = array("i")
+    for pid, code in processes.satas.items():
+        satas.extend((pid, string(code)))
+
+    initial = array("i")
+    for name, address, size in operations.initial_files:
+        initial.extend((indices[name], address, size))
+
+    # Linhas de cada processo em sequência, com (pid, fim) de cada grupo
+    owners = array("i")
+    order = array("i")
+    for pid, rows in operations.by_pid.items():
+        order.extend(rows)
+        owners.extend((pid, len(order)))
+
+    text = "\0".join(strings).encode()
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        BYTE_ORDERS[sys.byteorder],
+        len(processes),
+        len(operations.pid),
+        operations.total_blocks,
+        len(operations.initial_files),
+        len(operations.names),
+        len(strings),
+        len(text),
+        len(printers) // 2,
+        len(satas) // 2,
+        len(owners) // 2,
+        len(operations.missing),
+    )
+
+    with open(path, "wb") as f:
+        f.write(header)
+        for column in (
+            processes.init_duration,
+            processes.priority,
+            processes.cpu_duration,
+            processes.allocated_blocks,
+            processes.scanners,
+            processes.modems,
+            printers,
+            satas,
+            operations.pid,
+            operations.create,
+            operations.name,
+            operations.blocks,
+            initial,
+            owners,
+            order,
+            operations.missing,
+        ):
+            f.write(column)
+        f.write(text)
+
+
+def load_trace(path: str) -> tuple["ProcessTrace", "OperationTrace"]:
+    """Lê um traço compilado com uma única leitura do arquivo. Os pids
+    inexistentes são avisados como na leitura em texto."""
+    from simos.loader import OperationTrace, ProcessTrace
+    from simos.managers.resource import Modem, Printer, Sata, Scanner
+
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+
+    if len(data) < HEADER.size or data[: len(MAGIC)] != MAGIC:
+        raise TraceFileError(f"{path} não é um traço compilado.")
+    (
+        _,
+        version,
+        byte_order,
+        n_processes,
+        n_operations,
+        total_blocks,
+        n_initial,
+        n_names,
+        n_strings,
+        text_size,
+        n_printers,
+        n_satas,
+        n_owners,
+        n_missing,
+    ) = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise TraceFileError(f"{path}: versão {version} do traço não suportada.")
+    swap = byte_order != BYTE_ORDERS[sys.byteorder]
+
+    position = HEADER.size
+
+    def column(typecode: str, count: int):
+        nonlocal position
+        size = array(typecode).itemsize * count
+        chunk = data[position : position + size]
+        position += size
+        if typecode == "B":
+            return bytearray(chunk)
+        values = array(typecode)
+        values.frombytes(chunk)
+        if swap:
+            values.byteswap()
+        return values
+
+    processes = ProcessTrace()
+    processes.init_duration = column("i", n_processes)
+    processes.priority = column("i", n_processes)
+    processes.cpu_duration = column("i", n_processes)
+    processes.allocated_blocks = column("i", n_processes)
+    processes.scanners = column("B", n_processes)
+    processes.modems = column("B", n_processes)
+    printers = column("i", 2 * n_printers)
+    satas = column("i", 2 * n_satas)
+
+    pids = column("i", n_operations)
+    create = column("B", n_operations)
+    names = column("i", n_operations)
+    blocks = column("i", n_operations)
+    initial = column("i", 3 * n_initial)
+    owners = column("i", 2 * n_owners)
+    order = column("i", n_operations)
+    missing = column("i", n_missing)
+
+    text = bytes(data[position : position + text_size]).decode()
+    strings = text.split("\0") if n_strings > 0 else []
+
+    processes.printers = dict(zip(printers[::2], (strings[i] for i in printers[1::2])))
+    processes.satas = dict(zip(satas[::2], (strings[i] for i in satas[1::2])))
+    # Recursos existentes: cada processo usa no máximo um
+    resources: set = {Printer(code) for code in processes.printers.values()}
+    resources |= {Sata(code) for code in processes.satas.values()}
+    if 1 in processes.scanners:
+        resources.add(Scanner())
+    if 1 in processes.modems:
+        resources.add(Modem())
+    processes.resources = resources
+
+    initial_files = [
+        (strings[initial[i]], initial[i + 1], initial[i + 2]) for i in range(0, len(initial), 3)
+    ]
+    operations = OperationTrace(total_blocks, initial_files, n_processes)
+    operations.pid = pids
+    operations.create = create
+    operations.name = names
+    operations.blocks = blocks
+    operations.names = strings[:n_names]
+    operations.name_ids = {name: index for index, name in enumerate(operations.names)}
+    operations.missing = missing
+
+    start = 0
+    for i in range(0, len(owners), 2):
+        operations.by_pid[owners[i]] = order[start : owners[i + 1]]
+        start = owners[i + 1]
+
+    for pid in operations.missing:
+        print(f"Processo {pid} não existe")
+
+    return processes, operations
@@ -0,0 +1,96 @@
+import os
+import random
+from dataclasses import dataclass
+
+
+@dataclass
+class WorkloadConfig:
+    """Parâmetros de uma carga sintética"""
+
+    processes: int = 1000
+    seed: int = 0
+
+    # Peso de cada prioridade (0 é tempo real)
+    priority_weights: tuple[float, float, float, float] = (0.1, 0.3, 0.3, 0.3)
+
+    # Intervalos (mínimo, máximo) sorteados para cada processo
+    init_duration: tuple[int, int] = (0, 100)
+    cpu_duration: tuple[int, int] = (1, 10)
+    realtime_blocks: tuple[int, int] = (1, 64)
+    user_blocks: tuple[int, int] = (1, 256)
+
+    # Probabilidade de um processo usar um recurso de E/S
+    resource_usage: float = 0.2
+
+    # Operações de arquivo por processo (em média) e tamanho dos arquivos
+    file_ops: float = 1.0
+    file_blocks: tuple[int, int] = (1, 8)
+
+    disk_size: int = 1024
+    initial_files: int = 10
+
+
+def write_workload(directory: str, config: WorkloadConfig) -> tuple[str, str]:
+    """Gera `processes.txt` e `files.txt` no diretório e retorna seus
+    caminhos"""
+    rng = random.Random(config.seed)
+    os.makedirs(directory, exist_ok=True)
+    process_path = os.path.join(directory, "processes.txt")
+    ops_path = os.path.join(directory, "files.txt")
+
+    with open(process_path, "w") as f:
+        priorities = rng.choices(range(4), config.priority_weights, k=config.processes)
+        for priority in priorities:
+            low, high = config.realtime_blocks if priority == 0 else config.user_blocks
+            blocks = rng.randint(low, high)
+
+            # Cada processo usa no máximo um recurso:
+            # impressora, scanner, modem ou SATA
+            printer = scanner = modem = sata = 0
+            if rng.random() < config.resource_usage:
+                kind = rng.randrange(4)
+                if kind == 0:
+                    printer = rng.randint(1, 2)
+                elif kind == 1:
+                    scanner = 1
+                elif kind == 2:
+                    modem = 1
+                else:
+                    sata = rng.randint(1, 2)
+
+            f.write(
+                f"{rng.randint(*config.init_duration)}, {priority}, "
+                f"{rng.randint(*config.cpu_duration)}, {blocks}, "
+                f"{printer}, {scanner}, {modem}, {sata}\n"
+            )
+
+    with open(ops_path, "w") as f:
+        f.write(f"{config.disk_size}\n")
+
+        # Arquivos iniciais espalhados pelo disco, sem sobreposição
+        files: list[tuple[str, int, int]] = []
+        slot = config.disk_size // max(config.initial_files, 1)
+        for i in range(config.initial_files):
+            size = min(rng.randint(*config.file_blocks), slot)
+            if size <= 0:
+                break
+            address = i * slot + rng.randint(0, slot - size)
+            files.append((f"F{i}", address, size))
+
+        f.write(f"{len(files)}\n")
+        for name, address, size in files:
+            f.write(f"{name}, {address}, {size}\n")
+
+        # Operações sobre os arquivos iniciais e sobre novos arquivos
+        names = [name for name, _, _ in files]
+        n_ops = int(config.processes * config.file_ops)
+        for i in range(n_ops):
+            pid = rng.randrange(config.processes)
+            if len(names) == 0 or rng.random() < 0.5:
+                name = f"N{i}"
+                names.append(name)
+                f.write(f"{pid}, 0, {name}, {rng.randint(*config.file_blocks)}\n")
+            else:
+                f.write(f"{pid}, 1, {rng.choice(names)}\n")
+
+    return process_path, ops_path
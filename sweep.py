@@ -0,0 +1,135 @@
+import argparse
+import csv
+import sys
+
+from simos.loader import load_operations, load_processes
+from simos.managers.placement import POLICIES
+from simos.sweep import config_grid, sweep
+
+
+COLUMNS = [
+    "trace",
+    "quantum",
+    "cpus",
+    "aging",
+    "realtime_memory",
+    "disk_size",
+    "placement",
+    "compaction",
+    "completed",
+    "makespan",
+    "turnaround",
+    "waiting",
+    "cpu_utilisation",
+    "memory_utilisation",
+    "disk_utilisation",
+    "blocks",
+    "preemptions",
+    "promotions",
+    "blocked_time",
+    "compactions",
+    "moved_blocks",
+    "user_fragmentation",
+    "disk_fragmentation",
+]
+
+
+def aging(value: str) -> tuple[int, ...]:
+    return tuple(int(v) for v in value.split(","))
+
+
+def compaction(value: str) -> str:
+    if value not in ("off", "on"):
+        int(value)
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Roda o simulador para várias configurações em paralelo"
+    )
+    parser.add_argument(
+        "--trace",
+        nargs=2,
+        action="append",
+        required=True,
+        metavar=("PROCESS_FILE", "OPS_FILE"),
+        help="Arquivos de processos e de operações (pode ser repetido)",
+    )
+    parser.add_argument("--quantum", type=int, nargs="+", default=[1])
+    parser.add_argument("--cpus", type=int, nargs="+", default=[1])
+    parser.add_argument(
+        "--per-cpu-queues",
+        action="store_true",
+        help="Filas READY por CPU, com roubo de trabalho (padrão: compartilhadas)",
+    )
+    parser.add_argument(
+        "--aging",
+        type=aging,
+        nargs="+",
+        default=[(3, 5)],
+        help="Limiares de envelhecimento separados por vírgula (ex.: 3,5)",
+    )
+    parser.add_argument("--realtime-memory", type=int, nargs="+", default=[64])
+    parser.add_argument(
+        "--disk-size",
+        type=int,
+        nargs="+",
+        default=[None],
+        help="Tamanho do disco (padrão: o do arquivo de operações)",
+    )
+    parser.add_argument(
+        "--placement", nargs="+", choices=list(POLICIES), default=["first-fit"]
+    )
+    parser.add_argument(
+        "--compaction",
+        type=compaction,
+        nargs="+",
+        default=["off"],
+        help="Compactação da memória: off, on ou o máximo de blocos movidos",
+    )
+    parser.add_argument("--workers", type=int, help="Processos em paralelo")
+    parser.add_argument("--csv", help="Salva a tabela em CSV")
+    args = parser.parse_args()
+
+    # Cada traço é lido uma única vez e compartilhado com os processos
+    traces = []
+    for process_file, ops_file in args.trace:
+        processes = load_processes(process_file)
+        operations = load_operations(ops_file, processes)
+        traces.append((process_file, processes, operations))
+
+    configs = config_grid(
+        args.quantum,
+        args.aging,
+        args.realtime_memory,
+        args.disk_size,
+        args.placement,
+        args.compaction,
+        args.cpus,
+        args.per_cpu_queues,
+    )
+    results = sweep(traces, configs, args.workers)
+
+    out = open(args.csv, "w", newline="") if args.csv else sys.stdout
+    writer = csv.DictWriter(out, COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for result in results:
+        row = dict(result)
+        for key in (
+            "turnaround",
+            "waiting",
+            "cpu_utilisation",
+            "memory_utilisation",
+            "disk_utilisation",
+            "user_fragmentation",
+            "disk_fragmentation",
+        ):
+            row[key] = f"{row[key]:.3f}"
+        writer.writerow(row)
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == "__main__":
+    main()